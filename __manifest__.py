@@ -1,6 +1,6 @@
 {
     'name': "brain_api_rest",
-    'version': '1.0',
+    'version': '1.2',
     'depends': ['base', 'contacts', 'sale'],
     'author': "Reynaldo Villarreal",
     'category': 'Tools',
@@ -10,6 +10,7 @@
     # data files always loaded at installation
     'data': [
         'data/model_definition.xml',
+        'data/ir_cron_data.xml',
         'views/crm_lead_views.xml',
         'views/adoption_type_views.xml',
         'security/ir.model.access.csv',
@@ -5,4 +5,5 @@ from . import product_template_controller
 from . import partner_controller
 from . import sale_report_controller
 from . import crm_lead_controller
-from . import attachment_api
\ No newline at end of file
+from . import attachment_api
+from . import upload_controller
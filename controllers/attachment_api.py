@@ -1,7 +1,5 @@
-from odoo.http import request, route, Response
+from odoo.http import request, route
 from .auth_contoller import AuthController
-import base64
-from io import BytesIO
 
 class AttachmentAPI(AuthController):
 
@@ -18,18 +16,9 @@ class AttachmentAPI(AuthController):
         if not attachment.exists():
             return self._brain_response({"error": "Archivo no encontrado"}, 404)
 
-        if not attachment.datas:
+        if not attachment.file_size and attachment.type != 'url':
             return self._brain_response({"error": "El archivo no tiene contenido"}, 404)
 
-        # Decodificar el contenido y devolverlo como stream
-        file_data = base64.b64decode(attachment.datas)
-        mimetype = attachment.mimetype or 'application/octet-stream'
-
-        return Response(
-            BytesIO(file_data),
-            mimetype=mimetype,
-            headers={
-                'Content-Disposition': f'inline; filename="{attachment.name}"'
-            },
-            direct_passthrough=True
-        )
+        # Servir directamente desde el filestore (X-Sendfile, ETag, Range y 304 los resuelve Stream)
+        stream = env['ir.binary']._get_stream_from(attachment, default_mimetype='application/octet-stream')
+        return stream.get_response(as_attachment=False, immutable=bool(kwargs.get('unique')))
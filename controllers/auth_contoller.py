@@ -1,7 +1,19 @@
 from odoo import http, exceptions, fields
-from odoo.http import request, Response
+from odoo.http import request, Response, Stream
 from odoo.exceptions import AccessDenied
 from pprint import pformat
+from ..tools.cache import all_caches, get_cache, sequence_signature
+from ..models.idempotency_key import STATUS_PENDING
+from ..models.res_groups import ACCESS_EPOCH_SEQUENCE
+from ..tools.image_cache import get_variant
+from ..tools.metrics import instrument_routes, render_prometheus
+from ..tools.pagination import estimate_count, search_after
+from ..tools.serializer import select, serialize
+from .serializers import SERIALIZERS
+import functools
+import hashlib
+import math
+import os
 import time
 
 import logging
@@ -9,8 +21,74 @@ import json
 
 _logger = logging.getLogger(__name__)
 
+# Entradas máximas de las cachés de permisos y grupos de cada worker
+ACCESS_CACHE_SIZE = 4096
+
+# Segundos durante los que cada worker reutiliza su lectura de la época de permisos: en ese intervalo
+# las cachés de permisos no consultan la base de datos. Un cambio de grupos o ACLs hecho en otro
+# worker puede tardar hasta este tiempo en aplicarse aquí
+ACCESS_EPOCH_CHECK_INTERVAL = 5
+
+# Tamaños de imagen que Odoo guarda ya redimensionados (campos image_<tamaño>)
+IMAGE_SIZES = ('128', '256', '512', '1024')
+
+
+def idempotent(endpoint):
+    """Repite la respuesta registrada cuando un cliente reintenta con la misma cabecera Idempotency-Key.
+
+    Se aplica debajo de @http.route en los endpoints POST que crean registros. La clave se reserva
+    antes de ejecutar el endpoint: un duplicado concurrente recibe 409 en lugar de ejecutarse dos
+    veces. Las respuestas 5xx no se registran para que el cliente pueda reintentar; reutilizar una
+    clave con otra petición devuelve 422.
+    """
+    @functools.wraps(endpoint)
+    def wrapper(self, *args, **kwargs):
+        key = request.httprequest.headers.get('Idempotency-Key')
+        if not key:
+            return endpoint(self, *args, **kwargs)
+        if len(key) > 255:
+            return self._brain_response({'error': 'Idempotency-Key no puede superar 255 caracteres.'}, 400)
+        is_valid, user = self._verify_token()
+        if not is_valid:
+            return user
+
+        # Huella: método, ruta y cuerpo JSON (los form-data se transmiten en streaming y no se leen aquí)
+        httprequest = request.httprequest
+        fingerprint = hashlib.sha256(f'{httprequest.method} {httprequest.path}'.encode())
+        if httprequest.mimetype == 'application/json':
+            fingerprint.update(httprequest.get_data())
+        fingerprint = fingerprint.hexdigest()
+
+        IdempotencyKey = request.env['brain.idempotency.key'].sudo()
+        stored = IdempotencyKey._claim(user.id, key, fingerprint)
+        if stored:
+            if stored['fingerprint'] != fingerprint:
+                return self._brain_response({'error': 'Idempotency-Key ya usada con una petición distinta.'}, 422)
+            if stored['status'] == STATUS_PENDING:
+                return self._brain_response({'error': 'Hay una petición en curso con la misma Idempotency-Key.'}, 409)
+            return request.make_response(stored['body'], status=stored['status'], headers={
+                'Content-Type': stored['content_type'] or 'application/json',
+                'Idempotent-Replayed': 'true',
+            })
+
+        try:
+            response = endpoint(self, *args, **kwargs)
+        except Exception:
+            IdempotencyKey._release(user.id, key)
+            raise
+        IdempotencyKey._finish(user.id, key, response)
+        return response
+
+    return wrapper
+
+
 class AuthController(http.Controller):
 
+    def __init_subclass__(cls, **kwargs):
+        """Instrumenta automáticamente las rutas de todos los controladores derivados."""
+        super().__init_subclass__(**kwargs)
+        instrument_routes(cls)
+
     def _verify_token(self):
         """Función para verificar la autenticidad del token."""
         auth_header = request.httprequest.headers.get('Authorization')
@@ -18,14 +96,14 @@ class AuthController(http.Controller):
             return False, self._brain_response({'error': 'Token de autenticación no proporcionado o mal formado.'}, 401)
 
         token = auth_header.split(" ")[1]
-        # Verificar si el token existe y es válido
-        auth_token_model = request.env['auth.token'].sudo()
-        token_record = auth_token_model.search([('access_token', '=', token)], limit=1)
+        # Verificar si el token existe y es válido (primero en la caché del worker)
+        user_id = request.env['auth.token'].sudo()._get_access_token_user_id(token)
 
-        if not token_record or token_record.access_token_expiration < fields.Datetime.now():
+        if not user_id:
             return False, self._brain_response({'error': 'Token inválido o expirado.'}, 401)
-        _logger.info('USER ID: ' + str(token_record.user_id))
-        return True, token_record.user_id
+        user = request.env['res.users'].sudo().browse(user_id)
+        _logger.info('USER ID: ' + str(user))
+        return True, user
 
     @http.route('/api/login', type='http', auth='none', methods=['POST'], csrf=False)
     def login(self, **kwargs):
@@ -97,6 +175,31 @@ class AuthController(http.Controller):
             'refresh_expiration': refresh_expiration_timestamp
         }), headers={'Content-Type': 'application/json'})
 
+    @http.route('/api/logout', type='http', auth='none', methods=['POST'], csrf=False)
+    def logout(self, **kwargs):
+        """Endpoint para cerrar la sesión: revoca el access token y su refresh token."""
+        auth_header = request.httprequest.headers.get('Authorization')
+        if not auth_header or not auth_header.startswith('Bearer '):
+            return self._brain_response({'error': 'Token de autenticación no proporcionado o mal formado.'}, 401)
+
+        if not request.env['auth.token'].sudo().revoke_access_token(auth_header.split(" ")[1]):
+            return self._brain_response({'error': 'Token inválido o expirado.'}, 401)
+        return self._brain_response({'success': 'Sesión cerrada correctamente.'}, 200)
+
+    @http.route('/api/_metrics', type='http', auth='none', methods=['GET'], csrf=False)
+    def get_metrics(self, **kwargs):
+        """Métricas por ruta de este worker en formato de texto de Prometheus (solo administradores)."""
+        is_valid, user = self._verify_token()
+        if not is_valid:
+            return user
+        if not self._has_group(request.env(user=user), 'base.group_system'):
+            return self._brain_response({'error': 'Acceso denegado.'}, 403)
+
+        dbname = request.env.cr.dbname
+        cache_stats = {name: cache.stats() for (cache_db, name), cache in all_caches().items() if cache_db == dbname}
+        return request.make_response(render_prometheus(cache_stats),
+                                     headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+
     @http.route('/api/forgot_password', type='http', auth='none', methods=['POST'], csrf=False)
     def forgot_password(self, **kwargs):
         """API para restablecer la contraseña utilizando la funcionalidad nativa de Odoo"""
@@ -147,14 +250,151 @@ class AuthController(http.Controller):
         _logger.info('Checking access rights for user ID: {}'.format(user.id))
         _logger.info('Environment setup with user ID: {}'.format(env.uid))
 
+        # Resultado memorizado por (usuario, modelo, operación) hasta que cambien ACLs o grupos
+        # Solo se memorizan las decisiones; un error inesperado no se guarda para no repetirlo
+        cache = self._get_access_cache('access_rights')
+        cache_key = (user.id, model, operation)
+        error = cache.get(cache_key)
+        if error is None:
+            try:
+                env[model].check_access_rights(operation)
+                env[model].check_access_rule(operation)
+                error = ''
+            except AccessDenied as e:
+                _logger.error('Access Denied: %s', str(e))
+                error = 'Acceso denegado.'
+            except Exception as e:
+                _logger.error('Error checking access rights: %s', str(e))
+                return False, self._brain_response({'error': 'Error al verificar los derechos de acceso: ' + str(e)}, 403)
+            cache.set(cache_key, error)
+
+        if error:
+            return False, self._brain_response({'error': error}, 403)
+
+        return True, env  # Devolver True y el entorno configurado si todo es correcto
+
+    def _paginate(self, model, domain, kwargs, page, per_page, strict=True):
+        """Página `page` de `model` según ?count=exact|estimate|none.
+
+        - exact: search_count completo (comportamiento original).
+        - estimate: filas estimadas por el planificador de PostgreSQL.
+        - none: sin total; solo has_more, obtenido leyendo per_page + 1 registros.
+
+        Retorna (True, (registros, metadatos de paginación)) o (False, respuesta de error).
+        """
+        count_mode = kwargs.get('count', 'exact')
+        if count_mode not in ('exact', 'estimate', 'none'):
+            return False, self._brain_response({'error': 'El parámetro count debe ser exact, estimate o none.'}, 400)
+
+        if count_mode == 'exact':
+            total_items = model.search_count(domain)
+            # Un resultado vacío reporta 1 página, como el resto de endpoints paginados de la API
+            total_pages = max(1, math.ceil(total_items / per_page))
+            if strict and (page < 1 or page > total_pages):
+                return False, self._brain_response({'error': 'Página fuera de rango.'}, 400)
+            records = model.search(domain, offset=(page - 1) * per_page, limit=per_page)
+            has_more = page < total_pages
+        else:
+            if page < 1:
+                return False, self._brain_response({'error': 'Página fuera de rango.'}, 400)
+            records = model.search(domain, offset=(page - 1) * per_page, limit=per_page + 1)
+            has_more = len(records) > per_page
+            records = records[:per_page]
+            total_items = total_pages = None
+            if count_mode == 'estimate':
+                # La estimación nunca es menor que lo ya recorrido
+                total_items = max(estimate_count(model, domain), (page - 1) * per_page + len(records) + has_more)
+                total_pages = max(1, math.ceil(total_items / per_page))
+
+        return True, (records, {
+            'total_items': total_items,
+            'total_pages': total_pages,
+            'current_page': page,
+            'count_mode': count_mode,
+            'has_more': has_more,
+        })
+
+    def _image_response(self, record, **kwargs):
+        """Respuesta de imagen servida desde el filestore sin cargarla en memoria.
+
+        ?size=128|256|512|1024 usa los campos image_<size> que Odoo ya guarda redimensionados;
+        ?format=webp convierte la imagen una sola vez a una caché LRU en disco.
+        ir.binary usa X-Sendfile/X-Accel-Redirect si está configurado (x_sendfile), el checksum
+        como ETag fuerte (304 en peticiones condicionales), rangos de bytes y el mimetype real.
+        Las URLs versionadas con ?unique= se cachean como inmutables.
+        """
+        size = kwargs.get('size')
+        if size and size not in IMAGE_SIZES:
+            return self._brain_response({'error': 'size debe ser uno de: ' + ', '.join(IMAGE_SIZES)}, 400)
+        image_format = kwargs.get('format')
+        if image_format and image_format != 'webp':
+            return self._brain_response({'error': 'El único formato alternativo soportado es webp.'}, 400)
+
+        field_name = f'image_{size}' if size else 'image_1920'
+        immutable = bool(kwargs.get('unique'))
+        if not image_format:
+            stream = request.env['ir.binary']._get_image_stream_from(record, field_name)
+            return stream.get_response(immutable=immutable)
+
+        # Las variantes derivan de image_1920, así que su checksum identifica la versión
+        key = f"{record._table}_{record.brain_image_checksum}_{size or 1920}"
+        path = get_variant(request.env.cr.dbname, key,
+                           lambda: request.env['ir.binary']._get_stream_from(record, field_name).read())
+        if path is None:
+            # Imagen que Pillow no puede convertir (p. ej. SVG): se sirve la original
+            stream = request.env['ir.binary']._get_image_stream_from(record, field_name)
+            return stream.get_response(immutable=immutable)
+        stat = os.stat(path)
+        stream = Stream(type='path', path=path, mimetype='image/webp', etag=key, size=stat.st_size,
+                        last_modified=stat.st_mtime, download_name=f'{key}.webp', public=True)
+        return stream.get_response(immutable=immutable)
+
+    def _search_after(self, model, domain, kwargs, per_page):
+        """Paginación por cursor (?after=). Retorna (True, (registros, next_cursor)) o (False, respuesta de error)."""
         try:
-            env[model].check_access_rights(operation)
-            env[model].check_access_rule(operation)
-        except AccessDenied as e:
-            _logger.error('Access Denied: %s', str(e))
-            return False, self._brain_response({'error': 'Acceso denegado.'}, 403)
-        except Exception as e:
-            _logger.error('Error checking access rights: %s', str(e))
-            return False, self._brain_response({'error': 'Error al verificar los derechos de acceso: ' + str(e)}, 403)
+            return True, search_after(model, domain, kwargs.get('after'), per_page)
+        except ValueError as e:
+            return False, self._brain_response({'error': str(e)}, 400)
+
+    def _get_serializer(self, name, kwargs=None):
+        """Serializador registrado `name`, restringido al parámetro ?fields= si viene en `kwargs`.
+
+        Retorna (True, (modelo, spec)) o (False, respuesta HTTP de error).
+        """
+        model, spec = SERIALIZERS[name]
+        requested = (kwargs or {}).get('fields')
+        if requested:
+            try:
+                spec = select(spec, [path.strip() for path in requested.split(',') if path.strip()])
+            except ValueError as e:
+                return False, self._brain_response({'error': str(e)}, 400)
+        return True, (model, spec)
+
+    def _serialize(self, records, serializer):
+        """Serializa un recordset con un serializador registrado (nombre) o uno de _get_serializer."""
+        model, spec = SERIALIZERS[serializer] if isinstance(serializer, str) else serializer
+        if records._name != model:
+            raise ValueError(f'El serializador es para {model}, no para {records._name}.')
+        return serialize(records, spec)
+
+    def _get_access_cache(self, name):
+        """Caché de permisos del worker, vaciada cuando cambian grupos, pertenencias o permisos de acceso.
+
+        La época se lee como mucho una vez cada ACCESS_EPOCH_CHECK_INTERVAL segundos por worker.
+        """
+        cache = get_cache(name, request.env.cr.dbname, max_size=ACCESS_CACHE_SIZE)
+        cache.check_signature(sequence_signature(request.env, ACCESS_EPOCH_SEQUENCE, max_age=ACCESS_EPOCH_CHECK_INTERVAL))
+        return cache
+
+    def _has_group(self, env, group_xmlid):
+        """Indica si el usuario del entorno pertenece al grupo, usando la caché de grupos del worker."""
+        cache = self._get_access_cache('user_groups')
+        groups = cache.get(env.uid)
+        if groups is None:
+            groups = frozenset(env.user.sudo().groups_id.get_external_id().values())
+            cache.set(env.uid, groups)
+        return group_xmlid in groups
+
 
-        return True, env  # Devolver True y el entorno configurado si todo es correcto
\ No newline at end of file
+# Las rutas propias de AuthController también se instrumentan
+instrument_routes(AuthController)
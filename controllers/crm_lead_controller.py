@@ -2,7 +2,7 @@ import traceback
 
 from odoo import http, fields
 from odoo.http import request
-from .auth_contoller import AuthController
+from .auth_contoller import AuthController, idempotent
 from werkzeug.wrappers import Response
 import json
 import math
@@ -20,6 +20,11 @@ class CrmLeadController(AuthController):
             return result  # Si es una respuesta, contiene el error
 
         env = result
+        # Campos solicitados (?fields=)
+        check, serializer = self._get_serializer('crm.lead.list', kwargs)
+        if not check:
+            return serializer
+
         # Parámetros de paginación
         page = int(kwargs.get('page', 1))
         per_page = int(kwargs.get('per_page', 10))
@@ -28,76 +33,32 @@ class CrmLeadController(AuthController):
 
         # 🔒 Filtro: Portal solo ve sus propios leads
         domain = []
-        if env.user.has_group('base.group_portal'):
+        if self._has_group(env, 'base.group_portal'):
             domain.append(('user_id', '=', env.uid))
 
-        total_items = Lead.search_count([])
-        total_pages = math.ceil(total_items / per_page) if total_items > 0 else 1
-
-        if page < 1 or page > total_pages:
-            return self._brain_response({'error': 'Página fuera de rango.'}, 400)
-
-        leads = Lead.search(domain, offset=(page - 1) * per_page, limit=per_page)
-
-        lead_list = []
-        for lead in leads:
-            lead_data = {
-                'id': lead.id,
-                'name': lead.name or None,
-                'email_from': lead.email_from or None,
-                'phone': lead.phone or None,
-                'mobile': lead.mobile or None,
-                'stage_id': lead.stage_id.id if lead.stage_id else None,
-                'stage_name': lead.stage_id.name if lead.stage_id else None,
-                'partner_id': lead.partner_id.id if lead.partner_id else None,
-                'partner_name': lead.partner_id.name if lead.partner_id else None,
-                'expected_revenue': lead.expected_revenue or 0.0,
-                'probability': lead.probability or 0.0,
-                'user_id': lead.user_id.id if lead.user_id else None,
-                'user_name': lead.user_id.name if lead.user_id else None,
-                'company_id': lead.company_id.id if lead.company_id else None,
-                'company_name': lead.company_id.name if lead.company_id else None,
-                'create_date': lead.create_date.isoformat() if lead.create_date else None,
-                'create_uid': lead.create_uid.id if lead.create_uid else None,
-                'create_uid_name': lead.create_uid.name if lead.create_uid else None,
-                'description': lead.description,  # SE AGREGÓ EL CAMPO DESCRIPCION
-
-                # Campos personalizados
-                'address': lead.address or None,
-                'industry_id': lead.industry.id if lead.industry else None,
-                'industry_name': lead.industry.name if lead.industry else None,
-                'coordinador_id': lead.brain_coordinador.id if lead.brain_coordinador else None,
-                'coordinador_name': lead.brain_coordinador.name if lead.brain_coordinador else None,
-
-                'adoption_type_id': lead.adoption_type_id.id if lead.adoption_type_id else None,
-                'adoption_type_name': lead.adoption_type_id.name if lead.adoption_type_id else None,
-
-                'numero_a_portar': lead.numero_a_portar or None,
-                'sim_card': lead.sim_card or None,
-                'numero_de_la_linea_nueva': lead.numero_de_la_linea_nueva or None,
-
-                'brain_cuenta': lead.brain_cuenta or None,
-                'brain_orden': lead.brain_orden or None,
-                'brain_mrc': lead.brain_mrc or None,
-
-                'tipo_cliente_id': lead.tipo_cliente_id.id if lead.tipo_cliente_id else None,
-                'tipo_cliente_name': lead.tipo_cliente_id.name if lead.tipo_cliente_id else None,
-
-                'tipo_activacion_id': lead.tipo_activacion_id.id if lead.tipo_activacion_id else None,
-                'tipo_activacion_name': lead.tipo_activacion_id.name if lead.tipo_activacion_id else None,
-                'brain_province': lead.brain_province if lead.brain_province else None,
-                'backoffice': {
-                    'id': lead.brain_backoffice.id if lead.brain_backoffice else None,
-                    'name': lead.brain_backoffice.name if lead.brain_backoffice else None,
-                }
-            }
-            lead_list.append(lead_data)
+        # Paginación por cursor (?after=): sin OFFSET, estable ante inserciones concurrentes
+        if 'after' in kwargs:
+            check, result = self._search_after(Lead, domain, kwargs, per_page)
+            if not check:
+                return result
+            leads, next_cursor = result
+            return self._brain_response({
+                'status': 'success',
+                'next_cursor': next_cursor,
+                'items': self._serialize(leads, serializer)
+            }, 200)
+
+        # Paginación por página con total exacto, estimado o sin total (?count=)
+        check, result = self._paginate(Lead, domain, kwargs, page, per_page)
+        if not check:
+            return result
+        leads, pagination = result
+
+        lead_list = self._serialize(leads, serializer)
 
         response_data = {
             'status': 'success',
-            'total_items': total_items,
-            'total_pages': total_pages,
-            'current_page': page,
+            **pagination,
             'items': lead_list
         }
 
@@ -150,6 +111,7 @@ class CrmLeadController(AuthController):
         return self._brain_response({'status': 'success', 'items': users_list}, 200)
 
     @http.route('/api/leads/<int:lead_id>/attachments', type='http', auth='none', methods=['POST'], csrf=False)
+    @idempotent
     def upload_attachment(self, lead_id, **kwargs):
         # Verificar token
         check, result = self._check_access('crm.lead', operation='write')
@@ -162,28 +124,49 @@ class CrmLeadController(AuthController):
         if not lead.exists():
             return self._brain_response({'error': 'Lead no encontrado.'}, 404)
 
-        # Procesar archivos enviados (form-data)
+        # Archivos enviados en form-data o subidas por partes ya completadas (JSON {"upload_ids": [...]})
         files = request.httprequest.files.getlist('files')
-
-        if not files:
+        upload_ids = []
+        if not files and request.httprequest.mimetype == 'application/json':
+            data = request.get_json_data()
+            upload_ids = (data.get('upload_ids') if isinstance(data, dict) else None) or []
+            if not isinstance(upload_ids, list) or not all(isinstance(upload_id, str) for upload_id in upload_ids):
+                return self._brain_response({'error': 'upload_ids debe ser una lista de identificadores.'}, 400)
+
+        if not files and not upload_ids:
             return self._brain_response({'error': 'Debe enviar al menos un archivo en form-data.'}, 400)
 
-        attachment_ids = []
+        Attachment = env['ir.attachment'].sudo()
+        Session = env['brain.upload.session']
+        sessions = [Session._get_session(env.uid, upload_id) for upload_id in upload_ids]
+        if not all(sessions):
+            return self._brain_response({'error': 'Subida no encontrada o expirada.'}, 404)
+        # Todas las subidas se validan antes de crear ningún adjunto
+        incomplete = [session.upload_id for session in sessions if not session._is_complete()]
+        if incomplete:
+            return self._brain_response({'error': 'Subidas incompletas: ' + ', '.join(incomplete)}, 400)
 
-        for file in files:
-            filename = secure_filename(file.filename)
-            content = file.read()
-
-            attachment = env['ir.attachment'].sudo().create({
-                'name': filename,
-                'datas': base64.b64encode(content),
-                'res_model': 'crm.lead',
-                'res_id': lead.id,
-                'mimetype': file.mimetype,
-                'type': 'binary',
-            })
-
-            attachment_ids.append(attachment.id)
+        attachment_ids = []
+        try:
+            for file in files:
+                # Copia por bloques al filestore; el adjunto se crea por referencia sin base64
+                path, checksum, size = Attachment._brain_write_stream(
+                    file.stream, limit=Session._get_max_upload_size())
+                attachment = Attachment._brain_create_from_file(path, checksum, size, {
+                    'name': secure_filename(file.filename),
+                    'res_model': 'crm.lead',
+                    'res_id': lead.id,
+                    'mimetype': file.mimetype,
+                    'type': 'binary',
+                })
+                attachment_ids.append(attachment.id)
+
+            for session in sessions:
+                attachment_ids.append(session._attach('crm.lead', lead.id).id)
+        except ValueError as e:
+            # Revertir los adjuntos ya creados: la petición se aplica completa o no se aplica
+            env.cr.rollback()
+            return self._brain_response({'error': str(e)}, 400)
 
         # Post en el chatter con todos los archivos
         lead.message_post(
@@ -193,6 +176,7 @@ class CrmLeadController(AuthController):
         return self._brain_response({'success': 'Archivos adjuntados correctamente.'}, 200)
 
     @http.route('/api/leads', type='http', auth='none', methods=['POST'], csrf=False)
+    @idempotent
     def create_lead(self, **kwargs):
         """Crear una nueva oportunidad (Lead) desde la API y devolver su información completa."""
         check, result = self._check_access('crm.lead', 'create')
@@ -260,53 +244,22 @@ class CrmLeadController(AuthController):
                 except Exception:
                     return self._brain_response({'error': 'El campo "adoption_form" debe estar en base64 válido.'}, 400)
 
+            # O bien una subida por partes ya completada (sin base64 dentro del JSON)
+            adoption_upload = False
+            if values.get('adoption_form_upload_id'):
+                adoption_upload = env['brain.upload.session']._get_session(env.uid, values['adoption_form_upload_id'])
+                if not adoption_upload:
+                    return self._brain_response({'error': 'Subida no encontrada o expirada.'}, 404)
+                if not adoption_upload._is_complete():
+                    return self._brain_response({'error': 'La subida del formulario de adopción está incompleta.'}, 400)
+
             # Crear el lead
             lead = env['crm.lead'].sudo().create(lead_vals)
+            if adoption_upload:
+                self._set_adoption_form(lead, adoption_upload)
 
             # Armar respuesta completa
-            lead_data = {
-                'id': lead.id,
-                'name': lead.name or None,
-                'email_from': lead.email_from or None,
-                'phone': lead.phone or None,
-                'mobile': lead.mobile or None,
-                'stage_id': lead.stage_id.id if lead.stage_id else None,
-                'stage_name': lead.stage_id.name if lead.stage_id else None,
-                'partner_id': lead.partner_id.id if lead.partner_id else None,
-                'partner_name': lead.partner_id.name if lead.partner_id else None,
-                'expected_revenue': lead.expected_revenue or 0.0,
-                'probability': lead.probability or 0.0,
-                'user_id': lead.user_id.id if lead.user_id else None,
-                'user_name': lead.user_id.name if lead.user_id else None,
-                'company_id': lead.company_id.id if lead.company_id else None,
-                'company_name': lead.company_id.name if lead.company_id else None,
-                'create_date': lead.create_date.isoformat() if lead.create_date else None,
-                'create_uid': lead.create_uid.id if lead.create_uid else None,
-                'create_uid_name': lead.create_uid.name if lead.create_uid else None,
-
-                # Campos personalizados
-                'address': lead.address or None,
-                'industry_id': lead.industry.id if lead.industry else None,
-                'industry_name': lead.industry.name if lead.industry else None,
-                'coordinador_id': lead.brain_coordinador.id if lead.brain_coordinador else None,
-                'adoption_type_id': lead.adoption_type_id.id if lead.adoption_type_id else None,
-                'adoption_type_name': lead.adoption_type_id.name if lead.adoption_type_id else None,
-                'numero_a_portar': lead.numero_a_portar or None,
-                'sim_card': lead.sim_card or None,
-                'numero_de_la_linea_nueva': lead.numero_de_la_linea_nueva or None,
-                'brain_cuenta': lead.brain_cuenta or None,
-                'brain_orden': lead.brain_orden or None,
-                'brain_mrc': lead.brain_mrc or None,
-                'tipo_cliente_id': lead.tipo_cliente_id.id if lead.tipo_cliente_id else None,
-                'tipo_cliente_name': lead.tipo_cliente_id.name if lead.tipo_cliente_id else None,
-                'tipo_activacion_id': lead.tipo_activacion_id.id if lead.tipo_activacion_id else None,
-                'tipo_activacion_name': lead.tipo_activacion_id.name if lead.tipo_activacion_id else None,
-                'province': lead.brain_province if lead.brain_province else None,
-                'backoffice': {
-                    'id': lead.brain_backoffice.id if lead.brain_backoffice else None,
-                    'name': lead.brain_backoffice.name if lead.brain_backoffice else None,
-                }
-            }
+            lead_data = self._serialize(lead, 'crm.lead')[0]
 
             return self._brain_response({'status': 'success', 'lead': lead_data}, 201)
 
@@ -452,51 +405,22 @@ class CrmLeadController(AuthController):
                 except Exception:
                     return self._brain_response({'error': 'El campo "adoption_form" debe estar en base64 válido.'}, 400)
 
+            # O bien una subida por partes ya completada (sin base64 dentro del JSON)
+            adoption_upload = False
+            if values.get('adoption_form_upload_id'):
+                adoption_upload = env['brain.upload.session']._get_session(env.uid, values['adoption_form_upload_id'])
+                if not adoption_upload:
+                    return self._brain_response({'error': 'Subida no encontrada o expirada.'}, 404)
+                if not adoption_upload._is_complete():
+                    return self._brain_response({'error': 'La subida del formulario de adopción está incompleta.'}, 400)
+
             # Actualizar el lead
             lead.write(lead_vals)
+            if adoption_upload:
+                self._set_adoption_form(lead, adoption_upload)
 
             # Preparar respuesta
-            lead_data = {
-                'id': lead.id,
-                'name': lead.name or None,
-                'email_from': lead.email_from or None,
-                'phone': lead.phone or None,
-                'mobile': lead.mobile or None,
-                'stage_id': lead.stage_id.id if lead.stage_id else None,
-                'stage_name': lead.stage_id.name if lead.stage_id else None,
-                'partner_id': lead.partner_id.id if lead.partner_id else None,
-                'partner_name': lead.partner_id.name if lead.partner_id else None,
-                'expected_revenue': lead.expected_revenue or 0.0,
-                'probability': lead.probability or 0.0,
-                'user_id': lead.user_id.id if lead.user_id else None,
-                'user_name': lead.user_id.name if lead.user_id else None,
-                'company_id': lead.company_id.id if lead.company_id else None,
-                'company_name': lead.company_id.name if lead.company_id else None,
-                'create_date': lead.create_date.isoformat() if lead.create_date else None,
-                'create_uid': lead.create_uid.id if lead.create_uid else None,
-                'create_uid_name': lead.create_uid.name if lead.create_uid else None,
-                'address': lead.address or None,
-                'industry_id': lead.industry.id if lead.industry else None,
-                'industry_name': lead.industry.name if lead.industry else None,
-                'coordinador_id': lead.brain_coordinador.id if lead.brain_coordinador else None,
-                'adoption_type_id': lead.adoption_type_id.id if lead.adoption_type_id else None,
-                'adoption_type_name': lead.adoption_type_id.name if lead.adoption_type_id else None,
-                'numero_a_portar': lead.numero_a_portar or None,
-                'sim_card': lead.sim_card or None,
-                'numero_de_la_linea_nueva': lead.numero_de_la_linea_nueva or None,
-                'brain_cuenta': lead.brain_cuenta or None,
-                'brain_orden': lead.brain_orden or None,
-                'brain_mrc': lead.brain_mrc or None,
-                'tipo_cliente_id': lead.tipo_cliente_id.id if lead.tipo_cliente_id else None,
-                'tipo_cliente_name': lead.tipo_cliente_id.name if lead.tipo_cliente_id else None,
-                'tipo_activacion_id': lead.tipo_activacion_id.id if lead.tipo_activacion_id else None,
-                'tipo_activacion_name': lead.tipo_activacion_id.name if lead.tipo_activacion_id else None,
-                'province': lead.brain_province if lead.brain_province else None,
-                'backoffice': {
-                    'id': lead.brain_backoffice.id if lead.brain_backoffice else None,
-                    'name': lead.brain_backoffice.name if lead.brain_backoffice else None,
-                }
-            }
+            lead_data = self._serialize(lead, 'crm.lead')[0]
 
             return self._brain_response({'status': 'success', 'lead': lead_data}, 200)
 
@@ -504,3 +428,18 @@ class CrmLeadController(AuthController):
             error_msg = traceback.format_exc()
             return self._brain_response({'error': f'Error al actualizar el lead: {str(e)}', 'debug': error_msg}, 500)
 
+    def _set_adoption_form(self, lead, session):
+        """Asigna adoption_form desde una subida completa, por referencia si el campo se guarda como adjunto."""
+        if lead._fields['adoption_form'].attachment:
+            lead.env['ir.attachment'].sudo().search([
+                ('res_model', '=', 'crm.lead'),
+                ('res_field', '=', 'adoption_form'),
+                ('res_id', '=', lead.id),
+            ]).unlink()
+            session._attach('crm.lead', lead.id, 'adoption_form')
+            lead.invalidate_recordset(['adoption_form'])
+        else:
+            path = session._part_path()
+            with open(path, 'rb') as fp:
+                lead.adoption_form = base64.b64encode(fp.read())
+            session._close()
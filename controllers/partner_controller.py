@@ -1,11 +1,8 @@
 from odoo import http, fields
 from odoo.http import request
-from .auth_contoller import AuthController
-from werkzeug.wrappers import Response
+from .auth_contoller import AuthController, idempotent
 import json
 import math
-import base64
-from io import BytesIO
 
 class PartnerController(AuthController):
 
@@ -17,64 +14,43 @@ class PartnerController(AuthController):
             return result  # Si es una respuesta, contiene el error
 
         env = result
+        # Campos solicitados (?fields=)
+        check, serializer = self._get_serializer('res.partner.list', kwargs)
+        if not check:
+            return serializer
+
         # Parámetros de paginación
         page = int(kwargs.get('page', 1))  # Página actual, por defecto 1
         per_page = int(kwargs.get('per_page', 10))  # Elementos por página, por defecto 10
 
         # Obtener el modelo de socios
         Partner = env['res.partner']
-        total_items = Partner.search_count([])  # Total de socios
-        total_pages = math.ceil(total_items / per_page) if total_items > 0 else 1  # Paginación
-
-        if page < 1 or page > total_pages:
-            return self._brain_response({'error': 'Página fuera de rango.'}, 400)
 
-        # Obtener los socios en la página solicitada
-        partners = Partner.search([], offset=(page - 1) * per_page, limit=per_page)
+        # Paginación por cursor (?after=): sin OFFSET, estable ante inserciones concurrentes
+        if 'after' in kwargs:
+            check, result = self._search_after(Partner, [], kwargs, per_page)
+            if not check:
+                return result
+            partners, next_cursor = result
+            return self._brain_response({
+                'status': 'success',
+                'next_cursor': next_cursor,
+                'items': self._serialize(partners, serializer)
+            }, 200)
+
+        # Obtener los socios en la página solicitada, con total exacto, estimado o sin total (?count=)
+        check, result = self._paginate(Partner, [], kwargs, page, per_page)
+        if not check:
+            return result
+        partners, pagination = result
 
         # Construir la lista de socios con la información extendida
-        partner_list = []
-        for partner in partners:
-            category_info = [{
-                'category_id': category.id,
-                'category_name': category.name
-            } for category in partner.category_id]
-
-            #image_url = f"/web/image/res.partner/{partner.id}/image_1920" if partner.image_1920 else None
-            image_url = f"/partner/image/{partner.id}" if partner.image_1920 else None
-            partner_data = {
-                'id': partner.id,
-                'name': partner.name or None,
-                'email': partner.email or None,
-                'phone': partner.phone or None,
-                'mobile': partner.mobile or None,
-                'website': partner.website or None,
-                'city': partner.city or None,
-                'zip': partner.zip or None,
-                'country_id': partner.country_id.id if partner.country_id else None,
-                'country_name': partner.country_id.name if partner.country_id else None,
-                'street': partner.street or None,
-                'street2': partner.street2 or None,
-                'state_id': partner.state_id.id if partner.state_id else None,
-                'state_name': partner.state_id.name if partner.state_id else None,
-                'customer_rank': partner.customer_rank or None,
-                'supplier_rank': partner.supplier_rank or None,
-                'type': partner.type or None,  # Puede ser 'contact', 'invoice', 'delivery', etc.
-                'created_by': partner.create_uid.id if partner.create_uid else None,  # Usuario que creó el partner
-                'created_by_name': partner.create_uid.name if partner.create_uid else None,
-                'salesperson_id': partner.user_id.id if partner.user_id else None,  # Comercial asignado
-                'salesperson_name': partner.user_id.name if partner.user_id else None,  # Nombre del comercial asignado
-                'image_url': image_url,  # URL de la imagen del partner
-                'categories': category_info
-            }
-            partner_list.append(partner_data)
+        partner_list = self._serialize(partners, serializer)
 
         # Construir la respuesta final con metadatos de paginación
         response_data = {
             'status': 'success',
-            'total_items': total_items,
-            'total_pages': total_pages,
-            'current_page': page,
+            **pagination,
             'items': partner_list
         }
 
@@ -93,14 +69,13 @@ class PartnerController(AuthController):
         if not partner.exists():
             return self._brain_response({"error": "Partner not found"}, 404)
 
-        if not partner.image_1920:
+        if not partner.brain_image_checksum:
             return self._brain_response({"error": "No image found"}, 404)
 
-        image_data = base64.b64decode(partner.image_1920)
-        #return http.send_file(BytesIO(image_data), mimetype='image/png')
-        return Response(BytesIO(image_data), mimetype='image/png', direct_passthrough=True)
+        return self._image_response(partner, **kwargs)
 
     @http.route('/api/partners', type='http', auth="none", methods=['POST'], csrf=False)
+    @idempotent
     def create_partner(self, **kwargs):
         """API para crear un socio (res.partner) asegurando que el usuario tiene permisos adecuados."""
         check, result = self._check_access('res.partner', 'create')
@@ -208,37 +183,16 @@ class PartnerController(AuthController):
         if not check:
             return result  # Si es una respuesta, contiene el error
         env = result
+        check, serializer = self._get_serializer('res.partner', kwargs)
+        if not check:
+            return serializer
         # Obtener el partner
         partner = env['res.partner'].browse(partner_id)
         if not partner.exists():
             return self._brain_response({'error': 'Datos no encontrados.'}, 404)
 
         # Preparar los datos para la respuesta
-        partner_data = {
-            'id': partner.id,
-            'name': partner.name or None,
-            'email': partner.email or None,
-            'phone': partner.phone or None,
-            'city': partner.city or None,
-            'zip': partner.zip or None,
-            'country': {
-                'id': partner.country_id.id if partner.country_id else None,
-                'name': partner.country_id.name if partner.country_id else None,
-            },
-            'state': {
-                'id': partner.state_id.id if partner.state_id else None,
-                'name': partner.state_id.name if partner.state_id else None,
-            },
-            'street': partner.street or None,
-            'street2': partner.street2 or None,
-            'website': partner.website or None,
-            'is_company': partner.is_company or None,
-            'industry_id': {
-                'id': partner.industry_id.id if partner.industry_id else None,
-                'name': partner.industry_id.name if partner.industry_id else None,
-            },
-            'image_url': f"/web/image/res.partner/{partner.id}/image_1920" if partner.image_1920 else None
-        }
+        partner_data = self._serialize(partner, serializer)[0]
 
         # Devolver la información del partner
         return self._brain_response(partner_data, 200)
@@ -1,9 +1,6 @@
-from io import BytesIO
 from odoo import http, fields
-from werkzeug.wrappers import Response
 from odoo.http import request
 from .auth_contoller import AuthController
-import base64
 import json
 import math
 import logging
@@ -36,14 +33,12 @@ class ProductController(AuthController):
 
         # Obtener productos desde el modelo product.template con los filtros
         product_template = env['product.template']
-        total_items = product_template.search_count(domain)
-        total_pages = math.ceil(total_items / per_page) if total_items > 0 else 1
-
-        if page < 1 or page > total_pages:
-            return self._brain_response({'error': 'Página fuera de rango.'}, 400)
 
-        # Obtener los productos filtrados en la página solicitada
-        products = product_template.search(domain, offset=(page - 1) * per_page, limit=per_page)
+        # Obtener los productos filtrados en la página solicitada (?count= para el total)
+        check, result = self._paginate(product_template, domain, kwargs, page, per_page)
+        if not check:
+            return result
+        products, pagination = result
 
         # Construir la lista de productos
         product_list = []
@@ -104,14 +99,12 @@ class ProductController(AuthController):
                 },
                 'variants': variants,
                 'description': product.description_sale or None,
-                'image_url': f"/product/image/{product.id}" if product.image_1920 else None
+                'image_url': product._get_image_url('/product/image/')
             }
             product_list.append(product_data)
 
         response_data = {
-            'total_items': total_items,
-            'total_pages': total_pages,
-            'current_page': page,
+            **pagination,
             'items': product_list
         }
         return self._brain_response(response_data, 200)
@@ -171,7 +164,7 @@ class ProductController(AuthController):
             },
             'variants': variants,
             'description': product.description_sale or None,
-            'image_url': f"/web/image/product.template/{product.id}/image_1920" if product.image_1920 else None
+            'image_url': product._get_image_url('/web/image/product.template/', '/image_1920')
         }
 
         return self._brain_response({'product': product_data}, 200)
@@ -189,12 +182,10 @@ class ProductController(AuthController):
         if not product.exists():
             return self._brain_response({"error":"Product not found"}, 404)
 
-        if not product.image_1920:
+        if not product.brain_image_checksum:
             return self._brain_response({"error": "No image found"}, 404)
 
-        image_data = base64.b64decode(product.image_1920)
-        return Response(BytesIO(image_data), mimetype='image/png', direct_passthrough=True)
-        # return http.send_file(BytesIO(image_data), mimetype='image/png')
+        return self._image_response(product, **kwargs)
 
     @http.route('/api/product_categories', type='http', auth="none", methods=['GET'], csrf=False)
     def get_product_categories(self, **kwargs):
@@ -367,6 +358,9 @@ class ProductController(AuthController):
             return result  # Retorna el error si el token es inválido
 
         env = result
+        check, serializer = self._get_serializer('product.product.list', kwargs)
+        if not check:
+            return serializer
         try:
             # Parámetros de paginación y filtros
             page = int(kwargs.get('page', 1))
@@ -379,58 +373,29 @@ class ProductController(AuthController):
             if 'category' in kwargs:
                 domain.append(('categ_id.name', '=', kwargs['category']))
 
+            # Paginación por cursor (?after=): sin OFFSET, estable ante inserciones concurrentes
+            if 'after' in kwargs:
+                check, result = self._search_after(env['product.product'], domain, kwargs, per_page)
+                if not check:
+                    return result
+                products, next_cursor = result
+                items = self._serialize(products, serializer)
+                self._expand_categories(env, items)
+                return self._brain_response({'next_cursor': next_cursor, 'items': items})
+
             # Búsqueda de productos con los filtros aplicados
-            products = env['product.product'].search(domain, limit=per_page, offset=(page - 1) * per_page)
-            total_items = env['product.product'].search_count(domain)
-            total_pages = math.ceil(total_items / per_page)
+            check, result = self._paginate(env['product.product'], domain, kwargs, page, per_page, strict=False)
+            if not check:
+                return result
+            products, pagination = result
 
             # Recopilación de detalles de productos
-            items = []
-            for product in products:
-                categories = []
-                current_category = product.categ_id
-                while current_category:
-                    category_details = {
-                        'id': current_category.id,
-                        'name': current_category.name
-                    }
-                    categories.append(category_details)
-                    current_category = current_category.parent_id
-
-                attributes = []
-                for variant in product.product_template_variant_value_ids:
-                    attribute_detail = {
-                        'name': variant.attribute_id.name,
-                        'value': variant.name,
-                        'price_extra': variant.price_extra,
-                        'html_color': variant.html_color or None,
-                    }
-                    attributes.append(attribute_detail)
-
-                product_data = {
-                    'id': product.id,
-                    'internal_reference': product.default_code or None,
-                    'name': product.name,
-                    'sale_price': product.lst_price,
-                    'taxes': [
-                        {'id': tax.id, 'name': tax.name, 'amount': tax.amount, 'display_name': tax.display_name}
-                    for tax in product.taxes_id ],
-                    'standard_price': product.standard_price,
-                    'on_hand': product.qty_available,
-                    'virtual_available': product.virtual_available,
-                    'type': product.type,
-                    'product_tmpl_id': product.product_tmpl_id.id,
-                    'categories': categories[::-1],
-                    'attributes': attributes,
-                    'image_url': f"/product/image/{product.product_tmpl_id.id}" if product.image_1920 else None
-                }
-                items.append(product_data)
+            items = self._serialize(products, serializer)
+            self._expand_categories(env, items)
 
             # Devolver la respuesta en formato JSON
             response_data = {
-                'total_items': total_items,
-                'total_pages': total_pages,
-                'current_page': page,
+                **pagination,
                 'items': items
             }
             return self._brain_response(response_data)
@@ -439,53 +404,36 @@ class ProductController(AuthController):
             return self._brain_response({'error': 'Error interno del servidor: ' + str(e)}, 500)
 
     @http.route('/api/products/<int:product_id>', type='http', auth="none", methods=['GET'], csrf=False)
-    def get_product_by_id(self, product_id):
+    def get_product_by_id(self, product_id, **kwargs):
         check, result = self._check_access('product.product')
         if not check:
             return result  # Retorna el error si el token es inválido
 
         env = result
+        check, serializer = self._get_serializer('product.product', kwargs)
+        if not check:
+            return serializer
         try:
             product = env['product.product'].browse(product_id)
             if not product.exists():
                 return self._brain_response({'error': 'Producto no encontrado'}, 404)
 
-            categories = []
-            current_category = product.categ_id
-            while current_category:
-                category_details = {
-                    'id': current_category.id,
-                    'name': current_category.name
-                }
-                categories.append(category_details)
-                current_category = current_category.parent_id
-
-            attributes = []
-            for variant in product.product_template_variant_value_ids:
-                attribute_detail = {
-                    'name': variant.attribute_id.name,
-                    'value': variant.name,
-                    'price_extra': variant.price_extra,
-                    'html_color': variant.html_color or None,
-                }
-                attributes.append(attribute_detail)
-
-            product_data = {
-                'id': product.id,
-                'default_code': product.default_code or None,
-                'name': product.name,
-                'price': product.lst_price,
-                'standard_price': product.standard_price,
-                'quantity_on_hand': product.qty_available,
-                'virtual_available': product.virtual_available,
-                'type': product.type,
-                'product_tmpl_id': product.product_tmpl_id.id,
-                'categories': categories[::-1],
-                'attributes': attributes,
-                'image_url': f"/product/image/{product.product_tmpl_id.id}" if product.image_1920 else None
-            }
+            product_data = self._serialize(product, serializer)[0]
+            self._expand_categories(env, [product_data])
 
             return self._brain_response(product_data)
 
         except Exception as e:
-            return self._brain_response({'error': 'Error interno del servidor: ' + str(e)}, 500)
\ No newline at end of file
+            return self._brain_response({'error': 'Error interno del servidor: ' + str(e)}, 500)
+
+    def _expand_categories(self, env, items):
+        """Sustituye el parent_path de cada producto por su cadena de categorías (raíz primero) con una sola lectura."""
+        items = [item for item in items if 'categories' in item]
+        paths = {item['categories']: [int(category_id) for category_id in item['categories'].split('/') if category_id]
+                 for item in items if item['categories']}
+        category_ids = {category_id for ids in paths.values() for category_id in ids}
+        names = {category['id']: category['name']
+                 for category in env['product.category'].browse(list(category_ids)).read(['name'])}
+        for item in items:
+            item['categories'] = [{'id': category_id, 'name': names[category_id]}
+                                  for category_id in paths.get(item['categories'], []) if category_id in names]
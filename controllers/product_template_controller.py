@@ -59,8 +59,7 @@ class ProductTemplateController(AuthController):
                 'barcode': product.barcode or None,
                 'default_code': product.default_code or None,  # SKU
                 'active': product.active,
-                'image_url': "/web/image/product.template/{}/image_1920".format(
-                    product.id) if product.image_1920 else None,
+                'image_url': product._get_image_url('/web/image/product.template/', '/image_1920'),
                 'variants': variants
             }
             product_list.append(product_data)
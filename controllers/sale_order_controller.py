@@ -1,7 +1,7 @@
 from odoo import http, fields
 from odoo.http import request
 from odoo.exceptions import ValidationError
-from .auth_contoller import AuthController
+from .auth_contoller import AuthController, idempotent
 from datetime import datetime, timedelta
 import json
 import math
@@ -9,6 +9,9 @@ import logging
 
 _logger = logging.getLogger(__name__)
 
+# Máximo de cotizaciones aceptadas por llamada a /api/quotations/bulk
+BULK_QUOTATION_LIMIT = 500
+
 class SaleOrderController(AuthController):
 
     @http.route('/api/sale_orders', type='http', auth='none', methods=['GET'], csrf=False)
@@ -17,6 +20,9 @@ class SaleOrderController(AuthController):
         has_access, env = self._check_access('sale.order')
         if not has_access:
             return env  # Env ya es una respuesta HTTP de error
+        check, serializer = self._get_serializer('sale.order', kwargs)
+        if not check:
+            return serializer
         page = int(kwargs.get('page', 1))
         per_page = int(kwargs.get('per_page', 10))
         domain = []
@@ -30,125 +36,50 @@ class SaleOrderController(AuthController):
             domain.append(('name', 'ilike', kwargs['name']))
 
         # Restringir a órdenes del usuario actual si no es administrador
-        if not env.user.has_group('base.group_system'):
+        if not self._has_group(env, 'base.group_system'):
             domain.append(('user_id', '=', env.user.id))
 
         sale_order_model = env['sale.order']
-        total_items = sale_order_model.search_count(domain)
-        total_pages = math.ceil(total_items / per_page) if total_items > 0 else 1
-        if page < 1 or page > total_pages:
-            return request.make_response(json.dumps({'error': 'Página fuera de rango.'}),
-                                         headers={'Content-Type': 'application/json'}, status=400)
-        sale_orders = sale_order_model.search(domain, limit=per_page, offset=(page - 1) * per_page)
-        sale_orders_data = []
-        for order in sale_orders:
-            products_data = []
-            for line in order.order_line:
-                product_data = {
-                    'order_line_id': line.id,
-                    'product_id': line.product_id.id if line.product_id else None,
-                    'product_name': line.product_id.name if line.product_id else None,
-                    'image_url': f"/product/image/{line.product_id.product_tmpl_id.id}" if line.product_id.product_tmpl_id.image_1920 else None,
-                    'description': line.name or None,
-                    'quantity': line.product_uom_qty or None,
-                    'price_unit': line.price_unit or None,
-                    'subtotal': line.price_subtotal or None,
-                    'tax_ids': [{"id":tax.id,"tax": tax.name} for tax in line.tax_id]  # Ajustado para manejar como array
-                }
-                products_data.append(product_data)
-            order_data = {
-                'id': order.id,
-                'name': order.name,
-                'customer_id': order.partner_id.id if order.partner_id else None,
-                'customer_name': order.partner_id.name if order.partner_id else None,
-                'customer_address_inline': order.partner_id.contact_address_inline if order.partner_id else None,
-                'invoice_address': {
-                    'id': order.partner_invoice_id.id,  # Id del res.partner
-                    'name': order.partner_invoice_id.name  # Nombre del res.partner
-                } if order.partner_invoice_id else None,
-                'delivery_address': {
-                    'id': order.partner_shipping_id.id,  # Id del res.partner
-                    'name': order.partner_shipping_id.name
-                } if order.partner_shipping_id else None,
-                'payment_term': {
-                    'id': order.payment_term_id.id,
-                    'name': order.payment_term_id.name
-                } if order.payment_term_id else None,
-                'date_order': fields.Datetime.to_string(order.date_order) if order.date_order else None,
-                'amount_total': order.amount_total or None,
-                'state': order.state or None,
-                'salesperson': {
-                    'id': order.user_id.id or None,
-                    'name': order.user_id.name or None
-                } if order.user_id else None,
-                'expiration': fields.Date.to_string(order.validity_date) if order.validity_date else None,
-                'products': products_data
-            }
-            sale_orders_data.append(order_data)
+
+        # Paginación por cursor (?after=): sin OFFSET, estable ante inserciones concurrentes
+        if 'after' in kwargs:
+            check, result = self._search_after(sale_order_model, domain, kwargs, per_page)
+            if not check:
+                return result
+            sale_orders, next_cursor = result
+            return self._brain_response({
+                'next_cursor': next_cursor,
+                'items': self._serialize(sale_orders, serializer)
+            }, 200)
+
+        check, result = self._paginate(sale_order_model, domain, kwargs, page, per_page)
+        if not check:
+            return result
+        sale_orders, pagination = result
+        sale_orders_data = self._serialize(sale_orders, serializer)
         response_data = {
-            'total_items': total_items,
-            'total_pages': total_pages,
-            'current_page': page,
+            **pagination,
             'items': sale_orders_data
         }
         return  self._brain_response(response_data, 200)
 
     @http.route('/api/sale_orders/<int:sale_order_id>', type='http', auth='none', methods=['GET'], csrf=False)
-    def get_sale_order_details(self, sale_order_id):
+    def get_sale_order_details(self, sale_order_id, **kwargs):
         """Devuelve los detalles completos de una orden de venta por su ID."""
         # Verificación del acceso y obtención del entorno adecuado
         check, env = self._check_access('sale.order')
         if not check:
             return env  # Env ya es una respuesta HTTP de error
+        check, serializer = self._get_serializer('sale.order', kwargs)
+        if not check:
+            return serializer
 
         try:
             sale_order = env['sale.order'].browse(sale_order_id)
             if not sale_order.exists():
                 return self._brain_response({'error': 'Sale order not found'}, 404)
 
-            products_data = []
-            for line in sale_order.order_line:
-                product_data = {
-                    'order_line_id': line.id,
-                    'product_id': line.product_id.id if line.product_id else None,
-                    'product_name': line.product_id.name if line.product_id else None,
-                    'image_url': f"/product/image/{line.product_id.product_tmpl_id.id}" if line.product_id.product_tmpl_id.image_1920 else None,
-                    'description': line.name or None,
-                    'quantity': line.product_uom_qty or None,
-                    'price_unit': line.price_unit or None,
-                    'subtotal': line.price_subtotal or None,
-                    'tax_ids': [{"id": tax.id, "tax": tax.name} for tax in line.tax_id]
-                }
-                products_data.append(product_data)
-
-            order_details = {
-                'id': sale_order.id,
-                'name': sale_order.name,
-                'customer_id': sale_order.partner_id.id if sale_order.partner_id else None,
-                'customer_name': sale_order.partner_id.name if sale_order.partner_id else None,
-                'customer_address_inline': sale_order.partner_id.contact_address_inline if sale_order.partner_id else None,
-                'invoice_address': {
-                    'id': sale_order.partner_invoice_id.id,
-                    'name': sale_order.partner_invoice_id.name
-                } if sale_order.partner_invoice_id else None,
-                'delivery_address': {
-                    'id': sale_order.partner_shipping_id.id,
-                    'name': sale_order.partner_shipping_id.name
-                } if sale_order.partner_shipping_id else None,
-                'payment_term': {
-                    'id': sale_order.payment_term_id.id,
-                    'name': sale_order.payment_term_id.name
-                } if sale_order.payment_term_id else None,
-                'date_order': fields.Datetime.to_string(sale_order.date_order) if sale_order.date_order else None,
-                'amount_total': sale_order.amount_total or None,
-                'state': sale_order.state or None,
-                'salesperson': {
-                    'id': sale_order.user_id.id or None,
-                    'name': sale_order.user_id.name or None
-                } if sale_order.user_id else None,
-                'expiration': fields.Date.to_string(sale_order.validity_date) if sale_order.validity_date else None,
-                'products': products_data
-            }
+            order_details = self._serialize(sale_order, serializer)[0]
             return self._brain_response(order_details)
 
         except ValidationError as e:
@@ -169,49 +100,7 @@ class SaleOrderController(AuthController):
             if not sale_order.exists():
                 return self._brain_response({'error': 'Sale order not found'}, 404)
 
-            products_data = []
-            for line in sale_order.order_line:
-                product_data = {
-                    'order_line_id': line.id,
-                    'product_id': line.product_id.id if line.product_id else None,
-                    'product_name': line.product_id.name if line.product_id else None,
-                    'image_url': f"/product/image/{line.product_id.product_tmpl_id.id}" if line.product_id.product_tmpl_id.image_1920 else None,
-                    'description': line.name or None,
-                    'quantity': line.product_uom_qty or None,
-                    'price_unit': line.price_unit or None,
-                    'subtotal': line.price_subtotal or None,
-                    'tax_ids': [{"id": tax.id, "tax": tax.name} for tax in line.tax_id]
-                }
-                products_data.append(product_data)
-
-            order_details = {
-                'id': sale_order.id,
-                'name': sale_order.name,
-                'customer_id': sale_order.partner_id.id if sale_order.partner_id else None,
-                'customer_name': sale_order.partner_id.name if sale_order.partner_id else None,
-                'customer_address_inline': sale_order.partner_id.contact_address_inline if sale_order.partner_id else None,
-                'invoice_address': {
-                    'id': sale_order.partner_invoice_id.id,
-                    'name': sale_order.partner_invoice_id.name
-                } if sale_order.partner_invoice_id else None,
-                'delivery_address': {
-                    'id': sale_order.partner_shipping_id.id,
-                    'name': sale_order.partner_shipping_id.name
-                } if sale_order.partner_shipping_id else None,
-                'payment_term': {
-                    'id': sale_order.payment_term_id.id,
-                    'name': sale_order.payment_term_id.name
-                } if sale_order.payment_term_id else None,
-                'date_order': fields.Datetime.to_string(sale_order.date_order) if sale_order.date_order else None,
-                'amount_total': sale_order.amount_total or None,
-                'state': sale_order.state or None,
-                'salesperson': {
-                    'id': sale_order.user_id.id or None,
-                    'name': sale_order.user_id.name or None
-                } if sale_order.user_id else None,
-                'expiration': fields.Date.to_string(sale_order.validity_date) if sale_order.validity_date else None,
-                'products': products_data
-            }
+            order_details = self._serialize(sale_order, 'sale.order')[0]
             return order_details
 
         except ValidationError as e:
@@ -254,48 +143,22 @@ class SaleOrderController(AuthController):
                         editable_fields[field] = int(data[key])
                     else:
                         editable_fields[field] = data[key]
+
+            # Las líneas solo se modifican si se envía 'order_lines'; el diff se aplica con el mismo write
+            if 'order_lines' in data:
+                try:
+                    line_commands = self._diff_order_lines(sale_order, data['order_lines'])
+                except ValueError as e:
+                    return self._brain_response({'error': str(e)}, 400)
+                if line_commands:
+                    editable_fields['order_line'] = line_commands
+
+            # Un único write: importes e impuestos de la orden se recalculan una sola vez
             if editable_fields:
                 sale_order.write(editable_fields)
 
-            ######################## NUEVA SECCION PARA ELIMINAR UN PRODUCTO #############################
-            # Identificar y actualizar o crear líneas de producto
-            existing_lines_ids = {line.id for line in sale_order.order_line}
-            received_lines_ids = {int(line['order_line_id']) for line in data.get('order_lines', []) if
-                                  'order_line_id' in line}
-
-            # Eliminar líneas que no están en el nuevo conjunto de datos
-            lines_to_remove = existing_lines_ids - received_lines_ids
-            if lines_to_remove:
-                env['sale.order.line'].browse(list(lines_to_remove)).unlink()
-
-            ######################### FIN DE LA SECCIÓN PARA ELIMINAR UN PRODUCTO ##########################################
-
-            # Actualizar líneas de la orden solo si se proporciona 'order_lines'
-            if 'order_lines' in data:
-                for line in data['order_lines']:
-                    line_id = line.get('order_line_id')
-                    if line_id:
-                        existing_line = env['sale.order.line'].browse(int(line_id))
-                        if existing_line.exists():
-                            line_update = {k: v for k, v in line.items() if k not in ['order_line_id', 'tax_ids', 'quantity']}
-                            if 'tax_ids' in line:
-                                line_update['tax_id'] = [(6, 0, line['tax_ids'])]
-                            if 'quantity' in line:
-                                line_update['product_uom_qty'] = float(line['quantity'])
-                            existing_line.write(line_update)
-                    else:
-                        new_line = {
-                            'order_id': sale_order.id,
-                            'product_id': line['product_id'],
-                            'product_uom_qty': line['quantity'],
-                            'price_unit': line['price_unit'],
-                            'tax_id': [(6, 0, line.get('tax_ids', []))]
-                        }
-                        env['sale.order.line'].create(new_line)
-            try:
-                data_response = self.get_sale_order_details_dictionary(sale_order_id)
-            except Exception as e:
-                return self._brain_response({'error': str(e)}, 500)
+            # Respuesta con el entorno ya validado, sin volver a verificar el token
+            data_response = self._serialize(sale_order, 'sale.order')[0]
 
             return self._brain_response({
                 'id': sale_order.id,
@@ -310,8 +173,76 @@ class SaleOrderController(AuthController):
             _logger.error('Error updating sale order: %s', str(e))
             return self._brain_response({'error': str(e)}, 500)
 
+    def _diff_order_lines(self, sale_order, received_lines):
+        """Comandos x2many que llevan las líneas de la orden al estado recibido.
+
+        - Líneas existentes no recibidas: (2, id).
+        - Líneas recibidas con order_line_id de esta orden: (1, id, cambios), solo si algo cambia.
+        - Líneas sin order_line_id: (0, 0, valores).
+
+        Los valores actuales se leen de una vez para todas las líneas. Lanza ValueError si una
+        línea contiene campos desconocidos.
+        """
+        SaleOrderLine = sale_order.env['sale.order.line']
+        updates = {}
+        commands = []
+        for line in received_lines:
+            line_id = line.get('order_line_id')
+            if not line_id:
+                commands.append((0, 0, {
+                    'product_id': line['product_id'],
+                    'product_uom_qty': line['quantity'],
+                    'price_unit': line['price_unit'],
+                    'tax_id': [(6, 0, line.get('tax_ids', []))]
+                }))
+                continue
+            line_update = {k: v for k, v in line.items() if k not in ['order_line_id', 'tax_ids', 'quantity']}
+            if 'tax_ids' in line:
+                line_update['tax_id'] = line['tax_ids']
+            if 'quantity' in line:
+                line_update['product_uom_qty'] = float(line['quantity'])
+            unknown = [name for name in line_update if name not in SaleOrderLine._fields]
+            if unknown:
+                raise ValueError('Campos de línea desconocidos: ' + ', '.join(unknown))
+            updates[int(line_id)] = line_update
+
+        # Valores actuales de todas las líneas en una sola lectura. Sin campos que comparar basta con los
+        # ids: read([]) leería todos los campos de todas las líneas, calculados incluidos
+        field_names = sorted({name for line_update in updates.values() for name in line_update})
+        if field_names:
+            current = {row['id']: row for row in sale_order.order_line.read(['id', *field_names], load=None)}
+        else:
+            current = dict.fromkeys(sale_order.order_line.ids, {})
+
+        for line_id in current.keys() - updates.keys():
+            commands.append((2, line_id))
+        for line_id, line_update in updates.items():
+            # Se ignoran las líneas que no pertenecen a esta orden
+            if line_id not in current:
+                continue
+            changes = {
+                name: value for name, value in line_update.items()
+                if not self._same_line_value(SaleOrderLine._fields[name], current[line_id][name], value)
+            }
+            if changes:
+                if 'tax_id' in changes:
+                    changes['tax_id'] = [(6, 0, changes['tax_id'])]
+                commands.append((1, line_id, changes))
+        return commands
+
+    def _same_line_value(self, field, current, value):
+        """Compara un valor leído con read(load=None) con el recibido en el JSON."""
+        if field.type in ('many2many', 'one2many'):
+            return set(current) == {int(v) for v in value}
+        if field.type == 'many2one':
+            return (current or False) == (int(value) if value else False)
+        if field.type in ('float', 'monetary', 'integer'):
+            return value is not None and float(current or 0.0) == float(value)
+        return current == value
+
     # Método para crear cotizaciones usando el id de prodctos variantes.
     @http.route('/api/create_quotation_by_variants', type='http', auth="none", methods=['POST'], csrf=False)
+    @idempotent
     def create_quotation_by_variants(self, **kwargs):
         try:
             # Verificación del token
@@ -354,13 +285,10 @@ class SaleOrderController(AuthController):
             # Preparar datos de la orden con el partner correcto
             sale_order_data = self._prepare_order_data(data, partner, company, user)
 
-            # Procesar líneas de orden
-            order_lines = []
-            for line in data.get('order_line', []):
-                line_data = self._process_order_line(line, company)
-                if isinstance(line_data, dict) and 'error' in line_data:
-                    return self._brain_response(line_data, status=400)
-                order_lines.append(line_data)
+            # Procesar líneas de orden (todas las variantes se resuelven en una sola pasada)
+            order_lines = self._process_order_lines(data.get('order_line', []), company)
+            if isinstance(order_lines, dict) and 'error' in order_lines:
+                return self._brain_response(order_lines, status=400)
 
             sale_order_data['order_line'] = order_lines
 
@@ -427,46 +355,45 @@ class SaleOrderController(AuthController):
             'team_id': user.sale_team_id.id if user.sale_team_id else False
         }
 
-    def _process_order_line(self, line, company):
-        """Procesa una línea de orden y busca el producto correcto basado en las variantes."""
-        product_template_id = line.get('product_id')
-        variants = line.get('variants', [])
-
-        if not product_template_id:
-            return {'error': 'ID de producto requerido'}
-
-        # Construir dominio para búsqueda de producto con compañía correcta
-        product_domain = [
-            ('product_tmpl_id', '=', product_template_id),
-            '|',
-            ('company_id', '=', company.id),
-            ('company_id', '=', False)
+    def _process_order_lines(self, lines, company):
+        """Procesa las líneas de orden y busca el producto correcto de cada una según sus variantes.
+
+        Usa el índice de variantes en caché de product.product: una sola resolución para todas las
+        líneas y una lectura de precios para las que no envían price_unit.
+        """
+        combinations = []
+        for line in lines:
+            product_template_id = line.get('product_id')
+            if not product_template_id:
+                return {'error': 'ID de producto requerido'}
+            try:
+                combinations.append((int(product_template_id), frozenset(int(v) for v in line.get('variants') or [])))
+            except (TypeError, ValueError):
+                return {'error': f'Variantes no válidas para el template_id {product_template_id}'}
+
+        Product = company.env['product.product'].sudo().with_company(company.id)
+        resolved = Product._resolve_variants(company.id, combinations)
+
+        order_lines = []
+        for line, combination in zip(lines, combinations):
+            product_id = resolved[combination]
+            if not product_id:
+                return {'error': f"No se encontró producto con template_id {line.get('product_id')} y variantes {line.get('variants', [])}"}
+            order_lines.append((product_id, line))
+
+        # browse() conjunto: lst_price se calcula para todas las líneas a la vez
+        products = Product.browse([product_id for product_id, _line in order_lines])
+        return [
+            (0, 0, {
+                'product_id': product.id,
+                'product_uom_qty': line.get('product_uom_qty', 1.0),
+                'price_unit': line.get('price_unit') or product.lst_price,
+            })
+            for product, (_product_id, line) in zip(products, order_lines)
         ]
-        if variants:
-            product_domain.append(('product_template_variant_value_ids', 'in', variants))
-
-        # Buscar producto
-        Product = request.env['product.product'].sudo()
-        products = Product.with_company(company.id).search(product_domain)
-
-        if variants:
-            product = next((
-                p for p in products
-                if set(p.product_template_variant_value_ids.ids) == set(variants)
-            ), None)
-        else:
-            product = products[:1]
-
-        if not product:
-            return {'error': f'No se encontró producto con template_id {product_template_id} y variantes {variants}'}
-
-        return (0, 0, {
-            'product_id': product.id,
-            'product_uom_qty': line.get('product_uom_qty', 1.0),
-            'price_unit': line.get('price_unit') or product.lst_price,
-        })
 
     @http.route('/api/quotations', type='http', auth='none', methods=['POST'], csrf=False)
+    @idempotent
     def create_quotation(self):
         """Crear una nueva cotización"""
         # Verificar acceso
@@ -480,19 +407,118 @@ class SaleOrderController(AuthController):
                 data = json.loads(request.httprequest.data.decode('utf-8'))
             else:
                 data = request.params
-            # Validar campos requeridos
-            required_fields = ['partner_id']
-            for field in required_fields:
-                if field not in data:
-                    return self._brain_response({
-                        'error': f'Campo requerido faltante: {field}'
-                    }, 400)
 
-            # Calcular fecha de expiración (30 días por defecto)
-            quotation_date = datetime.now()
-            expiration_date = (quotation_date + timedelta(days=30)).strftime('%Y-%m-%d')
+            # Validar y preparar los datos de la cotización
+            try:
+                quotation_vals = self._prepare_quotation_vals(env, data)
+            except ValueError as e:
+                return self._brain_response({'error': str(e)}, 400)
+
+            # Mismo filtro de impuestos por compañía que /api/quotations/bulk
+            tax_ids = {tax_id for _command, _id, line_vals in quotation_vals['order_line'] for tax_id in line_vals['tax_id'][0][2]}
+            invalid_tax_ids = tax_ids - set(self._resolve_taxes(env, tax_ids).ids)
+            if invalid_tax_ids:
+                return self._brain_response({
+                    'error': 'Impuestos no válidos para la compañía: ' + ', '.join(map(str, sorted(invalid_tax_ids)))
+                }, 400)
 
-            # Preparar datos de la cotización
+            # Crear la cotización
+            quotation = env['sale.order'].create(quotation_vals)
+            try:
+                data_response = self.get_sale_order_details_dictionary(quotation.id)
+            except Exception as e:
+                return self._brain_response({'error': str(e)}, 500)
+
+            return self._brain_response({
+                'id': quotation.id,
+                'name': quotation.name,
+                'data': data_response
+            })
+
+        except ValidationError as e:
+            return self._brain_response({'error': str(e)}, 400)
+        except Exception as e:
+            _logger.error('Error creating quotation: %s', str(e))
+            return self._brain_response({'error': str(e)}, 500)
+
+    @http.route('/api/quotations/bulk', type='http', auth='none', methods=['POST'], csrf=False)
+    @idempotent
+    def create_quotations_bulk(self, **kwargs):
+        """Crear varias cotizaciones en una sola llamada (sincronización de cotizaciones offline).
+
+        Body JSON: {"quotations": [<payload de /api/quotations>, ...]}. Todos los payloads se validan
+        antes de crear nada, las referencias se comprueban con una consulta por modelo y las
+        cotizaciones válidas se crean con un único create(vals_list). Retorna un resultado por
+        elemento, en el mismo orden, con su id y nombre o el error correspondiente.
+        """
+        has_access, env = self._check_access('sale.order', 'create')
+        if not has_access:
+            return env
+
+        try:
+            data = json.loads(request.httprequest.data.decode('utf-8'))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return self._brain_response({'error': 'JSON inválido'}, 400)
+        payloads = data.get('quotations') if isinstance(data, dict) else data
+        if not isinstance(payloads, list) or not payloads:
+            return self._brain_response({'error': 'Se requiere una lista "quotations" no vacía.'}, 400)
+        if len(payloads) > BULK_QUOTATION_LIMIT:
+            return self._brain_response({'error': f'Máximo {BULK_QUOTATION_LIMIT} cotizaciones por llamada.'}, 400)
+
+        # 1. Validación estructural de todos los payloads
+        results = [None] * len(payloads)
+        vals_by_index = {}
+        for index, payload in enumerate(payloads):
+            try:
+                if not isinstance(payload, dict):
+                    raise ValueError('Cada cotización debe ser un objeto JSON.')
+                vals_by_index[index] = self._prepare_quotation_vals(env, payload)
+            except ValueError as e:
+                results[index] = {'index': index, 'status': 'error', 'error': str(e)}
+
+        # 2. Referencias (clientes, productos, impuestos, plazos de pago) en una consulta por modelo
+        for index, error in self._check_quotation_references(env, vals_by_index).items():
+            results[index] = {'index': index, 'status': 'error', 'error': error}
+            del vals_by_index[index]
+
+        # 3. Un único create para todas las cotizaciones válidas
+        SaleOrder = env['sale.order']
+        indexes = list(vals_by_index)
+        created = {}
+        try:
+            with env.cr.savepoint():
+                orders = SaleOrder.create([vals_by_index[index] for index in indexes])
+            created = dict(zip(indexes, orders))
+        except Exception as e:
+            # Si el lote falla, se crea una a una para atribuir el error a su cotización
+            _logger.info('Bulk quotation create failed, retrying item by item: %s', str(e))
+            for index in indexes:
+                try:
+                    with env.cr.savepoint():
+                        created[index] = SaleOrder.create(vals_by_index[index])
+                except Exception as item_error:
+                    results[index] = {'index': index, 'status': 'error', 'error': str(item_error)}
+
+        for index, order in created.items():
+            results[index] = {'index': index, 'status': 'created', 'id': order.id, 'name': order.name}
+
+        return self._brain_response({
+            'created': len(created),
+            'failed': len(payloads) - len(created),
+            'results': results,
+        }, 200)
+
+    def _prepare_quotation_vals(self, env, data):
+        """Valores de sale.order para un payload de /api/quotations. Lanza ValueError si no es válido."""
+        # Validar campos requeridos
+        if 'partner_id' not in data:
+            raise ValueError('Campo requerido faltante: partner_id')
+
+        # Calcular fecha de expiración (30 días por defecto)
+        quotation_date = datetime.now()
+        expiration_date = (quotation_date + timedelta(days=30)).strftime('%Y-%m-%d')
+
+        try:
             quotation_vals = {
                 'partner_id': int(data.get('partner_id')),
                 'company_id': env.user.company_id.id,
@@ -509,46 +535,75 @@ class SaleOrderController(AuthController):
                 # Campos adicionales
                 'note': data.get('note', '')  # Notas de la cotización
             }
-
-            # Procesar líneas de la orden si existen
-            order_lines = data.get('order_line', [])
-            if isinstance(order_lines, list):
-                for line in order_lines:
-                    if not all(k in line for k in ['product_id', 'product_uom_qty']):
-                        return self._brain_response({
-                            'error': 'Cada línea debe contener product_id y product_uom_qty'
-                        }, 400)
-
-                    line_vals = [0, 0, {
+        except (TypeError, ValueError):
+            raise ValueError('partner_id, partner_invoice_id, partner_shipping_id y payment_term_id deben ser IDs numéricos.')
+
+        # Procesar líneas de la orden si existen
+        order_lines = data.get('order_line', [])
+        if isinstance(order_lines, list):
+            for line in order_lines:
+                if not isinstance(line, dict) or not all(k in line for k in ['product_id', 'product_uom_qty']):
+                    raise ValueError('Cada línea debe contener product_id y product_uom_qty')
+
+                try:
+                    line_vals = {
                         'product_id': int(line['product_id']),
                         'product_uom_qty': float(line['product_uom_qty']),
                         'discount': float(line.get('discount', 0.0)),
-                        # 'tax_id': int(line['tax_id']),
-                        # TODO: Revisar que se envien en la lista de impuestos los impuestos relacionados a la empresa a la que pertence el cliente.
-                        'tax_id': [(6, 0, line['tax_id'])] if line['tax_id'] else [(6, 0, [])],
-                        'name': line['description'],
+                        'tax_id': [(6, 0, [int(tax_id) for tax_id in line.get('tax_id') or []])],
                         'price_unit': float(line.get('price_unit', 0.0))
-                    }]
-                    quotation_vals['order_line'].append(line_vals)
-
-            # Crear la cotización
-            quotation = env['sale.order'].create(quotation_vals)
-            try:
-                data_response = self.get_sale_order_details_dictionary(quotation.id)
-            except Exception as e:
-                return self._brain_response({'error': str(e)}, 500)
-
-            return self._brain_response({
-                'id': quotation.id,
-                'name': quotation.name,
-                'data': data_response
-            })
-
-        except ValidationError as e:
-            return self._brain_response({'error': str(e)}, 400)
-        except Exception as e:
-            _logger.error('Error creating quotation: %s', str(e))
-            return self._brain_response({'error': str(e)}, 500)
+                    }
+                except (TypeError, ValueError):
+                    raise ValueError('Las líneas contienen valores numéricos no válidos.')
+                if 'description' in line:
+                    line_vals['name'] = line['description']
+                quotation_vals['order_line'].append((0, 0, line_vals))
+
+        return quotation_vals
+
+    def _check_quotation_references(self, env, vals_by_index):
+        """Comprueba los IDs referenciados por varias cotizaciones con una búsqueda por modelo.
+
+        Retorna {índice: mensaje de error} para las cotizaciones con referencias inexistentes o
+        no accesibles para el usuario.
+        """
+        referenced = {'res.partner': set(), 'product.product': set(), 'account.tax': set(), 'account.payment.term': set()}
+        for vals in vals_by_index.values():
+            referenced['res.partner'].update((vals['partner_id'], vals['partner_invoice_id'], vals['partner_shipping_id']))
+            referenced['account.payment.term'].add(vals['payment_term_id'])
+            for _command, _id, line_vals in vals['order_line']:
+                referenced['product.product'].add(line_vals['product_id'])
+                referenced['account.tax'].update(line_vals['tax_id'][0][2])
+
+        found = {
+            model: set(env[model].search([('id', 'in', list(ids))]).ids) if ids else set()
+            for model, ids in referenced.items() if model != 'account.tax'
+        }
+        found['account.tax'] = set(self._resolve_taxes(env, referenced['account.tax']).ids)
+
+        errors = {}
+        for index, vals in vals_by_index.items():
+            missing = []
+            partner_ids = {vals['partner_id'], vals['partner_invoice_id'], vals['partner_shipping_id']}
+            missing += [f'res.partner({pid})' for pid in sorted(partner_ids - found['res.partner'])]
+            if vals['payment_term_id'] not in found['account.payment.term']:
+                missing.append(f"account.payment.term({vals['payment_term_id']})")
+            for _command, _id, line_vals in vals['order_line']:
+                if line_vals['product_id'] not in found['product.product']:
+                    missing.append(f"product.product({line_vals['product_id']})")
+                missing += [f'account.tax({tid})' for tid in line_vals['tax_id'][0][2] if tid not in found['account.tax']]
+            if missing:
+                errors[index] = 'Registros no encontrados: ' + ', '.join(dict.fromkeys(missing))
+        return errors
+
+    def _resolve_taxes(self, env, tax_ids):
+        """Impuestos de `tax_ids` utilizables en la compañía del usuario (la suya o una compañía padre)."""
+        if not tax_ids:
+            return env['account.tax']
+        return env['account.tax'].search([
+            ('id', 'in', list(tax_ids)),
+            ('company_id', 'parent_of', env.user.company_id.id),
+        ])
 
     @http.route('/api/sale_order/configs', type='http', auth="none", methods=['GET'], csrf=False)
     def get_sale_order_configs(self, **kwargs):
@@ -578,7 +633,12 @@ class SaleOrderController(AuthController):
 
     #Metodo que envia el email
     @http.route('/api/sale_orders/<int:sale_order_id>/send_email', type='http', auth="none", methods=['POST'], csrf=False)
+    @idempotent
     def send_sale_order_email(self, sale_order_id, **kwargs):
+        """Encola el envío por email de la cotización y responde 202 con el id del trabajo.
+
+        El render de la plantilla y del PDF lo hace el cron de la cola, fuera del worker HTTP.
+        """
         # Verificar el acceso usando el token y obteniendo el entorno adecuado
         check, result = self._check_access('sale.order')
         if not check:
@@ -587,20 +647,35 @@ class SaleOrderController(AuthController):
         env = result  # Usar el entorno configurado con el usuario del token
         sale_order = env['sale.order'].browse(sale_order_id)
         if not sale_order.exists():
-            return request.make_response(json.dumps({'error': 'Orden de venta no encontrada.'}),
-                                         headers={'Content-Type': 'application/json'}, status=404)
+            return self._brain_response({'error': 'Orden de venta no encontrada.'}, 404)
+
+        job = env['brain.email.job']._enqueue(sale_order, env.uid)
+        return self._brain_response({
+            'job_id': job.id,
+            'status': job.state,
+            'status_url': f'/api/email_jobs/{job.id}',
+        }, 202)
+
+    @http.route('/api/email_jobs/<int:job_id>', type='http', auth="none", methods=['GET'], csrf=False)
+    def get_email_job(self, job_id, **kwargs):
+        """Estado de un envío encolado con /api/sale_orders/<id>/send_email."""
+        check, env = self._check_access('sale.order')
+        if not check:
+            return env
 
-        try:
-            # Ejecutar la acción de enviar el correo electrónico asociado a la cotización
-            if 'action_quotation_send' in dir(sale_order):
-                sale_order.action_quotation_send()
-                sale_order.state = 'sent'
-                env.cr.commit()
-                return self._brain_response({'message': 'Email enviado correctamente.'})
-            else:
-                return self._brain_response({'error': 'Funcionalidad de envío de email no disponible.'}, 500)
-        except Exception as e:
-            return self._brain_response({'error': 'Error interno del servidor: ' + str(e)}, 500)
+        job = env['brain.email.job'].sudo().browse(job_id).exists()
+        if not job or (job.user_id.id != env.uid and not self._has_group(env, 'base.group_system')):
+            return self._brain_response({'error': 'Trabajo no encontrado.'}, 404)
+
+        return self._brain_response({
+            'job_id': job.id,
+            'sale_order_id': job.sale_order_id.id,
+            'status': job.state,
+            'attempts': job.attempts,
+            'error': job.error or None,
+            'created_at': fields.Datetime.to_string(job.create_date),
+            'sent_at': fields.Datetime.to_string(job.date_done) if job.date_done else None,
+        })
 
     @http.route('/api/sale_orders/<int:sale_order_id>/confirm', type='http', auth="none", methods=['GET'], csrf=False)
     def confirm_sale_order(self, **kwargs):
@@ -1,11 +1,150 @@
-from odoo import http
+from odoo import http, fields
 from odoo.http import request
-from datetime import datetime
+from datetime import datetime, timedelta
 from .auth_contoller import AuthController
+from ..tools.cache import get_cache
 import logging
+import time
 
 _logger = logging.getLogger(__name__)
 
+# Resultados de /api/reports/all que cada worker mantiene en memoria
+REPORT_CACHE_SIZE = 512
+
+# Segundos de validez de un rango cerrado (servido solo desde el resumen diario) y de un rango que
+# llega a los días calculados en vivo. Los rangos abiertos además se invalidan con la generación de
+# ventas en vivo; todos, con cada actualización del resumen.
+REPORT_CACHE_TTL_CLOSED = 6 * 3600
+REPORT_CACHE_TTL_OPEN = 300
+
+# Hechos de ventas por día con el alcance del usuario. Los días anteriores a %(live_start)s salen del
+# resumen diario (brain.sale.report.daily); el resto se calcula en vivo desde las órdenes con la
+# misma forma: filas sin producto con los totales por orden y filas por producto. Las filas por
+# producto usan las columnas de la orden copiadas en la línea (brain_date_order, state, company_id,
+# salesman_id), sin unir sale_order.
+REPORT_FACTS = """
+    facts AS MATERIALIZED (
+        SELECT r.date AS day, r.user_id, r.product_id, r.quantity, r.subtotal, r.amount_total, r.order_count
+          FROM brain_sale_report_daily r
+         WHERE r.date >= %(start)s
+           AND r.date < LEAST(%(end)s, %(live_start)s)
+           AND r.company_id = ANY(%(company_ids)s)
+           AND (%(user_id)s IS NULL OR r.user_id = %(user_id)s)
+        UNION ALL
+        SELECT so.date_order::date, so.user_id, NULL, 0, 0, SUM(so.amount_total), COUNT(*)
+          FROM sale_order so
+         WHERE so.date_order >= GREATEST(%(start)s, %(live_start)s)
+           AND so.date_order < %(end)s
+           AND so.state = 'sale'
+           AND so.company_id = ANY(%(company_ids)s)
+           AND (%(user_id)s IS NULL OR so.user_id = %(user_id)s)
+         GROUP BY so.date_order::date, so.user_id
+        UNION ALL
+        SELECT sol.brain_date_order::date, sol.salesman_id, sol.product_id,
+               SUM(sol.product_uom_qty), SUM(sol.price_subtotal), 0, COUNT(DISTINCT sol.order_id)
+          FROM sale_order_line sol
+         WHERE sol.brain_date_order >= GREATEST(%(start)s, %(live_start)s)
+           AND sol.brain_date_order < %(end)s
+           AND sol.state = 'sale'
+           AND sol.company_id = ANY(%(company_ids)s)
+           AND (%(user_id)s IS NULL OR sol.salesman_id = %(user_id)s)
+           AND sol.product_id IS NOT NULL
+         GROUP BY sol.brain_date_order::date, sol.salesman_id, sol.product_id
+    )
+"""
+
+# Los cuatro agregados de /api/reports/all en una sola consulta
+ALL_REPORTS_QUERY = "WITH " + REPORT_FACTS + """,
+    by_seller AS (
+        SELECT user_id, SUM(amount_total) AS amount_total, SUM(order_count) AS order_count
+          FROM facts
+         WHERE product_id IS NULL
+         GROUP BY user_id
+    ),
+    by_product AS (
+        SELECT product_id, SUM(quantity) AS quantity, SUM(subtotal) AS subtotal
+          FROM facts
+         WHERE product_id IS NOT NULL
+         GROUP BY product_id
+    ),
+    top_products AS (
+        SELECT pt.name AS product_name,
+               SUM(p.quantity) AS quantity_sold,
+               ROUND((SUM(p.quantity) / NULLIF(SUM(SUM(p.quantity)) OVER (), 0) * 100)::numeric, 2) AS percentage_of_total_sales
+          FROM by_product p
+          JOIN product_product pp ON pp.id = p.product_id
+          JOIN product_template pt ON pt.id = pp.product_tmpl_id
+         GROUP BY pt.name
+         ORDER BY quantity_sold DESC
+         LIMIT 10
+    )
+    SELECT
+        (SELECT COALESCE(SUM(amount_total), 0)::float FROM by_seller) AS total_sales,
+        (SELECT json_agg(t ORDER BY t.quantity_sold DESC) FROM top_products t) AS top_products,
+        (SELECT json_agg(json_build_array(user_id, amount_total, order_count)) FROM by_seller) AS sales_by_seller,
+        (SELECT json_agg(json_build_array(product_id, quantity, subtotal)) FROM by_product) AS sales_by_product
+"""
+
+# Agrupaciones de /api/reports/series: (expresión de la clave, modelo de los nombres)
+SERIES_GROUPS = {
+    'none': ('NULL::integer', None),
+    'salesperson': ('f.user_id', 'res.users'),
+    'product': ('f.product_id', 'product.product'),
+    'category': ('pt.categ_id', 'product.category'),
+}
+
+# Máximo de puntos por serie, en cualquier granularidad
+SERIES_MAX_BUCKETS = 1000
+
+# Serie temporal por cubo (date_trunc) y clave de agrupación, con los cubos vacíos rellenados a cero
+# a partir de generate_series. Las cantidades y subtotales salen de las filas por producto y el
+# número de órdenes de las filas de totales por orden (o de las filas por producto al agrupar por producto).
+SERIES_QUERY = "WITH " + REPORT_FACTS + """,
+    grouped AS (
+        SELECT date_trunc(%(granularity)s, f.day::timestamp)::date AS bucket,
+               {group_expr} AS group_key,
+               SUM(f.quantity) FILTER (WHERE f.product_id IS NOT NULL) AS quantity,
+               SUM(f.subtotal) FILTER (WHERE f.product_id IS NOT NULL) AS subtotal,
+               SUM(f.order_count) FILTER (WHERE {orders_filter}) AS orders
+          FROM facts f
+          LEFT JOIN product_product pp ON pp.id = f.product_id
+          LEFT JOIN product_template pt ON pt.id = pp.product_tmpl_id
+         WHERE {group_filter}
+         GROUP BY 1, 2
+    ),
+    buckets AS (
+        SELECT generate_series(date_trunc(%(granularity)s, %(start)s::timestamp),
+                               date_trunc(%(granularity)s, %(last)s::timestamp),
+                               ('1 ' || %(granularity)s)::interval)::date AS bucket
+    ),
+    -- Solo las claves (hasta limit) con mayor subtotal se cruzan con los cubos
+    top_keys AS (
+        SELECT group_key, COALESCE(SUM(subtotal), 0) AS total
+          FROM grouped
+         WHERE {key_filter}
+         GROUP BY group_key
+         ORDER BY total DESC, group_key
+         LIMIT %(limit)s
+    ),
+    group_keys AS (
+        SELECT group_key, total FROM top_keys
+        UNION ALL
+        -- Siempre al menos una fila, para devolver los cubos aunque no haya ventas
+        SELECT NULL, 0 WHERE NOT EXISTS (SELECT 1 FROM top_keys)
+    )
+    SELECT k.group_key,
+           array_agg(to_char(b.bucket, 'YYYY-MM-DD') ORDER BY b.bucket) AS buckets,
+           array_agg(COALESCE(g.quantity, 0)::float ORDER BY b.bucket) AS quantity,
+           array_agg(COALESCE(g.subtotal, 0)::float ORDER BY b.bucket) AS subtotal,
+           array_agg(COALESCE(g.orders, 0)::integer ORDER BY b.bucket) AS orders
+      FROM group_keys k
+     CROSS JOIN buckets b
+      LEFT JOIN grouped g ON g.bucket = b.bucket AND g.group_key IS NOT DISTINCT FROM k.group_key
+     GROUP BY k.group_key, k.total
+     ORDER BY k.total DESC, k.group_key
+"""
+
+
 class SalesReportController(AuthController):
 
     @http.route('/api/reports/all', type='http', auth='none', methods=['GET'], csrf=False)
@@ -15,76 +154,190 @@ class SalesReportController(AuthController):
         if not check:
             return env  # Env ya es una respuesta HTTP de error
 
-        start_date = kwargs.get('start_date', datetime.today().strftime('%Y-%m-%d'))
-        end_date = kwargs.get('end_date', datetime.today().strftime('%Y-%m-%d'))
+        check, result = self._get_report_range(kwargs)
+        if not check:
+            return result
+        start_date, end_date = result
 
         try:
-            data = {
-                'top_products': self.get_top_products(env, start_date, end_date),
-                'total_sales': self.get_total_sales(env, start_date, end_date),
-                'sales_by_seller': self.get_sales_by_seller(env, start_date, end_date),
-                'sales_by_product': self.get_sales_by_product(env, start_date, end_date)
-            }
-            return self._brain_response(data)
+            data, age = self._get_cached_reports(env, start_date, end_date)
+            return self._brain_response({**data, 'cache_age': age})
         except Exception as e:
             _logger.error(f"Error obtaining reports: {str(e)}")
             return self._brain_response({'error': 'Internal server error'}, status=500)
 
-    def get_top_products(self, env, start_date, end_date):
-        query = """
-            SELECT
-                pt.name AS product_name,
-                SUM(sol.product_uom_qty) AS quantity_sold,
-                ROUND((SUM(sol.product_uom_qty) / total.total_quantity) * 100, 2) AS percentage_of_total_sales
-            FROM
-                sale_order_line sol
-                JOIN sale_order so ON so.id = sol.order_id
-                JOIN product_product pp ON pp.id = sol.product_id
-                JOIN product_template pt ON pt.id = pp.product_tmpl_id,
-                (SELECT SUM(product_uom_qty) AS total_quantity FROM sale_order_line sol
-                 JOIN sale_order so ON so.id = sol.order_id
-                 WHERE so.date_order >= %s AND so.date_order <= %s AND so.state = 'sale') AS total
-            WHERE
-                so.date_order >= %s AND
-                so.date_order <= %s AND
-                so.state = 'sale'
-            GROUP BY
-                pt.name, total.total_quantity
-            ORDER BY
-                quantity_sold DESC
-            LIMIT 10;
+    @http.route('/api/reports/series', type='http', auth='none', methods=['GET'], csrf=False)
+    def get_report_series(self, **kwargs):
+        """Serie temporal de ventas para gráficos, en una sola consulta.
+
+        Parámetros: granularity=day|week|month (day por defecto), start_date, end_date y
+        group_by=salesperson|product|category (opcional), limit (series devueltas, 10 por defecto).
+        Devuelve los cubos y, por serie, arrays paralelos de quantity, subtotal y orders.
+        """
+        check, env = self._check_access('sale.order')
+        if not check:
+            return env
+
+        check, result = self._get_report_range(kwargs)
+        if not check:
+            return result
+        start_date, end_date = result
+
+        granularity = kwargs.get('granularity', 'day')
+        if granularity not in ('day', 'week', 'month'):
+            return self._brain_response({'error': 'granularity debe ser day, week o month.'}, 400)
+        group_by = kwargs.get('group_by', 'none')
+        if group_by not in SERIES_GROUPS:
+            return self._brain_response({'error': 'group_by debe ser salesperson, product o category.'}, 400)
+        if self._count_buckets(start_date, end_date, granularity) > SERIES_MAX_BUCKETS:
+            return self._brain_response({'error': f'El rango no puede superar {SERIES_MAX_BUCKETS} puntos.'}, 400)
+        try:
+            limit = int(kwargs.get('limit', 10))
+        except ValueError:
+            return self._brain_response({'error': 'limit debe ser un número entero.'}, 400)
+
+        try:
+            data = self._compute_series(env, start_date, end_date, granularity, group_by, limit)
+            return self._brain_response(data)
+        except Exception as e:
+            _logger.error(f"Error obtaining report series: {str(e)}")
+            return self._brain_response({'error': 'Internal server error'}, status=500)
+
+    def _compute_series(self, env, start_date, end_date, granularity, group_by, limit):
+        group_expr, names_model = SERIES_GROUPS[group_by]
+        query = SERIES_QUERY.format(
+            group_expr=group_expr,
+            # Al agrupar por producto o categoría solo cuentan las filas por producto
+            group_filter='TRUE' if group_by in ('none', 'salesperson') else 'f.product_id IS NOT NULL',
+            orders_filter='f.product_id IS NULL' if group_by in ('none', 'salesperson') else 'f.product_id IS NOT NULL',
+            # La clave vacía solo es una serie sin agrupación
+            key_filter='TRUE' if group_by == 'none' else 'group_key IS NOT NULL',
+        )
+        env.cr.execute(query, {
+            'start': start_date,
+            'end': end_date + timedelta(days=1),
+            'last': end_date,
+            'live_start': env['brain.sale.report.daily']._get_live_start() or start_date,
+            'company_ids': env.user.company_ids.ids,
+            'user_id': self._get_report_scope(env),
+            'granularity': granularity,
+            'limit': max(limit, 1),
+        })
+        rows = env.cr.dictfetchall()
+
+        buckets = rows[0]['buckets'] if rows else []
+        if group_by != 'none':
+            # La fila sin clave solo existe cuando no hay ventas en el rango
+            rows = [row for row in rows if row['group_key'] is not None]
+
+        names = {}
+        if names_model:
+            names = {record.id: record.display_name
+                     for record in env[names_model].sudo().browse([row['group_key'] for row in rows])}
+
+        return {
+            'granularity': granularity,
+            'group_by': group_by,
+            'buckets': buckets,
+            'series': [{
+                'key': row['group_key'],
+                'name': names.get(row['group_key'], 'Total'),
+                'quantity': row['quantity'],
+                'subtotal': row['subtotal'],
+                # Sin número de órdenes por categoría: una orden puede repetirse entre productos
+                'orders': row['orders'] if group_by != 'category' else None,
+            } for row in rows],
+        }
+
+    def _count_buckets(self, start_date, end_date, granularity):
+        """Número de cubos de date_trunc(granularity) entre dos fechas, ambas incluidas."""
+        if granularity == 'week':
+            first = start_date - timedelta(days=start_date.weekday())
+            last = end_date - timedelta(days=end_date.weekday())
+            return (last - first).days // 7 + 1
+        if granularity == 'month':
+            return (end_date.year - start_date.year) * 12 + end_date.month - start_date.month + 1
+        return (end_date - start_date).days + 1
+
+    def _get_report_range(self, kwargs):
+        """Rango de fechas (?start_date=, ?end_date=, ambos incluidos; hoy por defecto).
+
+        Retorna (True, (inicio, fin)) como fechas, o (False, respuesta de error).
         """
-        env.cr.execute(query, (start_date, end_date, start_date, end_date))
-        results = env.cr.dictfetchall()
-        return results
-
-    def get_total_sales(self, env, start_date, end_date):
-        sale_orders = env['sale.order'].search(
-            [('date_order', '>=', start_date), ('date_order', '<=', end_date), ('state', 'in', ['sale', 'done'])])
-        return sum(order.amount_total for order in sale_orders)
-
-    def get_sales_by_seller(self, env, start_date, end_date):
-        domain = [('date_order', '>=', start_date), ('date_order', '<=', end_date), ('state', '=', 'sale')]
-        if not env.user.has_group('base.group_system'):
-            domain.append(('user_id', '=', env.user.id))
-        results = env['sale.order'].read_group(domain, ['user_id', 'amount_total'], ['user_id'])
-        # Ajustar formato de user_id
-        formatted_results = [{
-            'userId': result['user_id'][0],
-            'userName': result['user_id'][1],
-            'amountTotal': result['amount_total'],
-            'count': result['user_id_count']
-        } for result in results]
-        return formatted_results
-
-    def get_sales_by_product(self, env, start_date, end_date):
-        domain = [('order_id.date_order', '>=', start_date), ('order_id.date_order', '<=', end_date), ('order_id.state', '=', 'sale')]
-        results = env['sale.order.line'].read_group(domain, ['product_id', 'product_uom_qty', 'price_subtotal'], ['product_id'])
-        # Ajustar formato para excluir dominios
-        formatted_results = [{
-            'productId': result['product_id'][0],
-            'productName': result['product_id'][1],
-            'quantitySold': result['product_uom_qty'],
-            'totalSales': result['price_subtotal']
-        } for result in results]
-        return formatted_results
+        today = datetime.today().strftime('%Y-%m-%d')
+        try:
+            start_date = fields.Date.to_date(kwargs.get('start_date', today))
+            end_date = fields.Date.to_date(kwargs.get('end_date', today))
+        except ValueError:
+            return False, self._brain_response({'error': 'Las fechas deben tener el formato YYYY-MM-DD.'}, 400)
+        if start_date > end_date:
+            return False, self._brain_response({'error': 'start_date no puede ser posterior a end_date.'}, 400)
+        return True, (start_date, end_date)
+
+    def _get_report_scope(self, env):
+        """Vendedor al que se limitan los reportes: None para administradores, el propio usuario en otro caso."""
+        return None if self._has_group(env, 'base.group_system') else env.user.id
+
+    def _get_cached_reports(self, env, start_date, end_date):
+        """Reportes del rango para el alcance del usuario, desde la caché si están vigentes.
+
+        Retorna (datos, antigüedad en segundos). La clave es (vendedor, compañías, rango): todos los
+        dispositivos con el mismo alcance comparten la entrada. Incluye además la última
+        actualización del resumen diario, que cambia cuando el cron recalcula días, y, si el rango
+        llega a los días calculados en vivo, la generación de ventas en vivo.
+        """
+        Rollup = env['brain.sale.report.daily']
+        last_run = Rollup._get_last_run()
+        live_start = Rollup._get_live_start()
+        is_open = live_start is None or end_date >= live_start
+        generation = Rollup._get_generation() if is_open else None
+        key = (self._get_report_scope(env), tuple(env.user.company_ids.ids), start_date, end_date, last_run, generation)
+
+        cache = get_cache('sales_reports', env.cr.dbname, max_size=REPORT_CACHE_SIZE)
+        cached = cache.get(key)
+        if cached is not None:
+            data, computed_at = cached
+            return data, round(time.time() - computed_at, 1)
+
+        data = self._compute_all_reports(env, start_date, end_date)
+        cache.set(key, (data, time.time()), ttl=REPORT_CACHE_TTL_OPEN if is_open else REPORT_CACHE_TTL_CLOSED)
+        return data, 0.0
+
+    def _compute_all_reports(self, env, start_date, end_date):
+        """Calcula top_products, total_sales, sales_by_seller y sales_by_product con una sola consulta
+        sobre el resumen diario más los días aún no resumidos."""
+        # Sin resumen calculado todo el rango se calcula en vivo
+        live_start = env['brain.sale.report.daily']._get_live_start() or start_date
+        env.cr.execute(ALL_REPORTS_QUERY, {
+            'start': start_date,
+            'end': end_date + timedelta(days=1),
+            'live_start': live_start,
+            'company_ids': env.user.company_ids.ids,
+            'user_id': self._get_report_scope(env),
+        })
+        row = env.cr.dictfetchone()
+
+        # Nombres visibles resueltos con una lectura por modelo
+        sellers = row['sales_by_seller'] or []
+        products = row['sales_by_product'] or []
+        user_names = {user.id: user.display_name
+                      for user in env['res.users'].sudo().browse([s[0] for s in sellers if s[0]])}
+        product_names = {product.id: product.display_name
+                         for product in env['product.product'].sudo().browse([p[0] for p in products])}
+
+        return {
+            'top_products': row['top_products'] or [],
+            'total_sales': row['total_sales'],
+            'sales_by_seller': [{
+                'userId': user_id,
+                'userName': user_names.get(user_id),
+                'amountTotal': amount_total,
+                'count': count
+            } for user_id, amount_total, count in sellers],
+            'sales_by_product': [{
+                'productId': product_id,
+                'productName': product_names[product_id],
+                'quantitySold': quantity,
+                'totalSales': subtotal
+            } for product_id, quantity, subtotal in products],
+        }
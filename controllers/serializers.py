@@ -0,0 +1,209 @@
+from odoo import fields
+from ..models.image_checksum_mixin import image_url
+from ..tools.serializer import Computed, Field, Many, Nested
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+def _image_url(prefix, suffix=''):
+    """URL de imagen versionada a partir de (id, brain_image_checksum); None si no hay imagen."""
+    return lambda record_id, checksum: image_url(prefix, record_id, checksum, suffix)
+
+
+# Campos comunes de una oportunidad (crm.lead)
+LEAD = {
+    'id': 'id',
+    'name': Field('name', default=None),
+    'email_from': Field('email_from', default=None),
+    'phone': Field('phone', default=None),
+    'mobile': Field('mobile', default=None),
+    'stage_id': 'stage_id.id',
+    'stage_name': 'stage_id.name',
+    'partner_id': 'partner_id.id',
+    'partner_name': 'partner_id.name',
+    'expected_revenue': Field('expected_revenue', default=0.0),
+    'probability': Field('probability', default=0.0),
+    'user_id': 'user_id.id',
+    'user_name': 'user_id.name',
+    'company_id': 'company_id.id',
+    'company_name': 'company_id.name',
+    'create_date': Field('create_date', convert=_isoformat),
+    'create_uid': 'create_uid.id',
+    'create_uid_name': 'create_uid.name',
+
+    # Campos personalizados
+    'address': Field('address', default=None),
+    'industry_id': 'industry.id',
+    'industry_name': 'industry.name',
+    'coordinador_id': 'brain_coordinador.id',
+    'adoption_type_id': 'adoption_type_id.id',
+    'adoption_type_name': 'adoption_type_id.name',
+    'numero_a_portar': Field('numero_a_portar', default=None),
+    'sim_card': Field('sim_card', default=None),
+    'numero_de_la_linea_nueva': Field('numero_de_la_linea_nueva', default=None),
+    'brain_cuenta': Field('brain_cuenta', default=None),
+    'brain_orden': Field('brain_orden', default=None),
+    'brain_mrc': Field('brain_mrc', default=None),
+    'tipo_cliente_id': 'tipo_cliente_id.id',
+    'tipo_cliente_name': 'tipo_cliente_id.name',
+    'tipo_activacion_id': 'tipo_activacion_id.id',
+    'tipo_activacion_name': 'tipo_activacion_id.name',
+    'backoffice': {
+        'id': 'brain_backoffice.id',
+        'name': 'brain_backoffice.name',
+    },
+}
+
+# Listado de oportunidades: incluye descripción, nombre del coordinador y 'brain_province'
+LEAD_LIST = dict(LEAD, **{
+    'description': 'description',
+    'coordinador_name': 'brain_coordinador.name',
+    'brain_province': Field('brain_province', default=None),
+})
+
+# Respuesta de creación/actualización de una oportunidad
+LEAD_DETAIL = dict(LEAD, **{
+    'province': Field('brain_province', default=None),
+})
+
+PARTNER_LIST = {
+    'id': 'id',
+    'name': Field('name', default=None),
+    'email': Field('email', default=None),
+    'phone': Field('phone', default=None),
+    'mobile': Field('mobile', default=None),
+    'website': Field('website', default=None),
+    'city': Field('city', default=None),
+    'zip': Field('zip', default=None),
+    'country_id': 'country_id.id',
+    'country_name': 'country_id.name',
+    'street': Field('street', default=None),
+    'street2': Field('street2', default=None),
+    'state_id': 'state_id.id',
+    'state_name': 'state_id.name',
+    'customer_rank': Field('customer_rank', default=None),
+    'supplier_rank': Field('supplier_rank', default=None),
+    'type': Field('type', default=None),
+    'created_by': 'create_uid.id',
+    'created_by_name': 'create_uid.name',
+    'salesperson_id': 'user_id.id',
+    'salesperson_name': 'user_id.name',
+    'image_url': Computed(_image_url('/partner/image/'), 'id', 'brain_image_checksum'),
+    'categories': Many('category_id', {
+        'category_id': 'id',
+        'category_name': 'name',
+    }),
+}
+
+PARTNER_DETAIL = {
+    'id': 'id',
+    'name': Field('name', default=None),
+    'email': Field('email', default=None),
+    'phone': Field('phone', default=None),
+    'city': Field('city', default=None),
+    'zip': Field('zip', default=None),
+    'country': {
+        'id': 'country_id.id',
+        'name': 'country_id.name',
+    },
+    'state': {
+        'id': 'state_id.id',
+        'name': 'state_id.name',
+    },
+    'street': Field('street', default=None),
+    'street2': Field('street2', default=None),
+    'website': Field('website', default=None),
+    'is_company': Field('is_company', default=None),
+    'industry_id': {
+        'id': 'industry_id.id',
+        'name': 'industry_id.name',
+    },
+    'image_url': Computed(_image_url('/web/image/res.partner/', '/image_1920'), 'id', 'brain_image_checksum'),
+}
+
+SALE_ORDER_LINE = {
+    'order_line_id': 'id',
+    'product_id': 'product_id.id',
+    'product_name': 'product_id.name',
+    'image_url': Computed(_image_url('/product/image/'),
+                          'product_id.product_tmpl_id.id', 'product_id.product_tmpl_id.brain_image_checksum'),
+    'description': Field('name', default=None),
+    'quantity': Field('product_uom_qty', default=None),
+    'price_unit': Field('price_unit', default=None),
+    'subtotal': Field('price_subtotal', default=None),
+    'tax_ids': Many('tax_id', {'id': 'id', 'tax': 'name'}),
+}
+
+SALE_ORDER = {
+    'id': 'id',
+    'name': 'name',
+    'customer_id': 'partner_id.id',
+    'customer_name': 'partner_id.name',
+    'customer_address_inline': 'partner_id.contact_address_inline',
+    'invoice_address': Nested('partner_invoice_id', {'id': 'id', 'name': 'name'}),
+    'delivery_address': Nested('partner_shipping_id', {'id': 'id', 'name': 'name'}),
+    'payment_term': Nested('payment_term_id', {'id': 'id', 'name': 'name'}),
+    'date_order': Field('date_order', convert=fields.Datetime.to_string),
+    'amount_total': Field('amount_total', default=None),
+    'state': Field('state', default=None),
+    'salesperson': Nested('user_id', {
+        'id': Field('id', default=None),
+        'name': Field('name', default=None),
+    }),
+    'expiration': Field('validity_date', convert=fields.Date.to_string),
+    'products': Many('order_line', SALE_ORDER_LINE),
+}
+
+PRODUCT_ATTRIBUTE_VALUE = {
+    'name': 'attribute_id.name',
+    'value': 'name',
+    'price_extra': 'price_extra',
+    'html_color': Field('html_color', default=None),
+}
+
+# 'categories' trae el parent_path de la categoría; el controlador lo expande a la cadena completa
+PRODUCT_LIST = {
+    'id': 'id',
+    'internal_reference': Field('default_code', default=None),
+    'name': 'name',
+    'sale_price': 'lst_price',
+    'taxes': Many('taxes_id', {'id': 'id', 'name': 'name', 'amount': 'amount', 'display_name': 'display_name'}),
+    'standard_price': 'standard_price',
+    'on_hand': 'qty_available',
+    'virtual_available': 'virtual_available',
+    'type': 'type',
+    'product_tmpl_id': 'product_tmpl_id.id',
+    'categories': 'categ_id.parent_path',
+    'attributes': Many('product_template_variant_value_ids', PRODUCT_ATTRIBUTE_VALUE),
+    'image_url': Computed(_image_url('/product/image/'), 'product_tmpl_id.id',
+                          'product_tmpl_id.brain_image_checksum'),
+}
+
+PRODUCT_DETAIL = {
+    'id': 'id',
+    'default_code': Field('default_code', default=None),
+    'name': 'name',
+    'price': 'lst_price',
+    'standard_price': 'standard_price',
+    'quantity_on_hand': 'qty_available',
+    'virtual_available': 'virtual_available',
+    'type': 'type',
+    'product_tmpl_id': 'product_tmpl_id.id',
+    'categories': 'categ_id.parent_path',
+    'attributes': Many('product_template_variant_value_ids', PRODUCT_ATTRIBUTE_VALUE),
+    'image_url': Computed(_image_url('/product/image/'), 'product_tmpl_id.id',
+                          'product_tmpl_id.brain_image_checksum'),
+}
+
+# Registro de serializadores: nombre -> (modelo, especificación)
+SERIALIZERS = {
+    'crm.lead': ('crm.lead', LEAD_DETAIL),
+    'crm.lead.list': ('crm.lead', LEAD_LIST),
+    'res.partner': ('res.partner', PARTNER_DETAIL),
+    'res.partner.list': ('res.partner', PARTNER_LIST),
+    'sale.order': ('sale.order', SALE_ORDER),
+    'product.product': ('product.product', PRODUCT_DETAIL),
+    'product.product.list': ('product.product', PRODUCT_LIST),
+}
@@ -0,0 +1,78 @@
+from odoo import http
+from odoo.http import request
+from .auth_contoller import AuthController, idempotent
+import json
+
+
+class UploadController(AuthController):
+
+    @http.route('/api/uploads', type='http', auth='none', methods=['POST'], csrf=False)
+    @idempotent
+    def start_upload(self, **kwargs):
+        """Inicia una subida reanudable por partes.
+
+        Body JSON: {"filename", "mimetype", "size"}. Los bloques se envían después con
+        PUT /api/uploads/<upload_id> y la cabecera Upload-Offset; el upload_id completado se usa en
+        /api/leads/<id>/attachments (upload_ids) o en adoption_form_upload_id de los leads.
+        """
+        check, result = self._check_access('ir.attachment', 'create')
+        if not check:
+            return result
+        env = result
+
+        try:
+            data = json.loads(request.httprequest.data)
+            size = int(data['size'])
+            filename = data['filename']
+        except (ValueError, KeyError, TypeError):
+            return self._brain_response({'error': 'Se requieren "filename" y "size" en un JSON válido.'}, 400)
+
+        try:
+            session = env['brain.upload.session']._start(env.uid, filename, data.get('mimetype'), size)
+        except ValueError as e:
+            return self._brain_response({'error': str(e)}, 400)
+        return self._brain_response(self._upload_status(session), 201)
+
+    @http.route('/api/uploads/<string:upload_id>', type='http', auth='none', methods=['PUT'], csrf=False)
+    def upload_chunk(self, upload_id, **kwargs):
+        """Recibe un bloque (body application/octet-stream) en la posición indicada por Upload-Offset."""
+        check, result = self._check_access('ir.attachment', 'create')
+        if not check:
+            return result
+        env = result
+
+        session = env['brain.upload.session']._get_session(env.uid, upload_id)
+        if not session:
+            return self._brain_response({'error': 'Subida no encontrada o expirada.'}, 404)
+        try:
+            offset = int(request.httprequest.headers.get('Upload-Offset', ''))
+        except ValueError:
+            return self._brain_response({'error': 'La cabecera Upload-Offset es obligatoria.'}, 400)
+
+        try:
+            session._append(request.httprequest.stream, offset)
+        except ValueError as e:
+            # El cliente reanuda desde el offset actual
+            return self._brain_response({'error': str(e), **self._upload_status(session)}, 409)
+        return self._brain_response(self._upload_status(session), 200)
+
+    @http.route('/api/uploads/<string:upload_id>', type='http', auth='none', methods=['GET'], csrf=False)
+    def get_upload(self, upload_id, **kwargs):
+        """Estado de una subida, para reanudarla tras un corte de red."""
+        check, result = self._check_access('ir.attachment', 'create')
+        if not check:
+            return result
+        env = result
+
+        session = env['brain.upload.session']._get_session(env.uid, upload_id)
+        if not session:
+            return self._brain_response({'error': 'Subida no encontrada o expirada.'}, 404)
+        return self._brain_response(self._upload_status(session), 200)
+
+    def _upload_status(self, session):
+        return {
+            'upload_id': session.upload_id,
+            'offset': session.offset,
+            'size': session.size,
+            'complete': session.offset == session.size,
+        }
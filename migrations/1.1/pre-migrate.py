@@ -0,0 +1,30 @@
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    """Convierte los tokens guardados en claro a su digest SHA-256 antes de crear las restricciones únicas."""
+    if not version:
+        return
+
+    cr.execute("""
+        ALTER TABLE auth_token
+            ADD COLUMN IF NOT EXISTS access_token_hash varchar(64),
+            ADD COLUMN IF NOT EXISTS refresh_token_hash varchar(64)
+    """)
+    # Mismo cálculo que hash_token(): sha256 del token en UTF-8, en hexadecimal
+    cr.execute("""
+        UPDATE auth_token
+           SET access_token_hash = encode(sha256(convert_to(access_token, 'UTF8')), 'hex'),
+               refresh_token_hash = encode(sha256(convert_to(refresh_token, 'UTF8')), 'hex')
+         WHERE access_token_hash IS NULL
+    """)
+    _logger.info("auth.token: %s tokens migrados a digest SHA-256", cr.rowcount)
+    # El ORM conserva las columnas de los campos eliminados (solo les quita el NOT NULL): los tokens
+    # en claro se eliminan aquí, una vez calculados sus digests
+    cr.execute("""
+        ALTER TABLE auth_token
+            DROP COLUMN IF EXISTS access_token,
+            DROP COLUMN IF EXISTS refresh_token
+    """)
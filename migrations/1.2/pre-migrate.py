@@ -0,0 +1,19 @@
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    """Crea y rellena por SQL la fecha de la orden en sale_order_line, para que el ORM no la calcule línea a línea."""
+    if not version:
+        return
+
+    cr.execute("ALTER TABLE sale_order_line ADD COLUMN IF NOT EXISTS brain_date_order timestamp")
+    cr.execute("""
+        UPDATE sale_order_line sol
+           SET brain_date_order = so.date_order
+          FROM sale_order so
+         WHERE so.id = sol.order_id
+           AND sol.brain_date_order IS DISTINCT FROM so.date_order
+    """)
+    _logger.info("sale.order.line: fecha de la orden copiada en %s líneas", cr.rowcount)
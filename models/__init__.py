@@ -1,6 +1,20 @@
 from . import auth_token
+from . import auth_token_revocation
+from . import ir_attachment
+from . import upload_session
+from . import idempotency_key
+from . import email_job
+from . import res_groups
+from . import ir_model_access
 from . import res_users
 from . import crm_lead
 from . import brain_adoption_type
 from . import brain_tipo_cliente
 from . import brain_tipo_activacion
+from . import image_checksum_mixin
+from . import res_partner
+from . import product_template
+from . import sale_order
+from . import sale_order_line
+from . import sale_report_daily
+from . import product_product
@@ -1,23 +1,71 @@
 from odoo import models, fields, api
 from datetime import datetime, timedelta
+from ..tools.cache import bump_sequence_after_commit, get_cache, sequence_signature
+import base64
+import hashlib
+import hmac
+import json
+import logging
 import secrets
+import time
+
+_logger = logging.getLogger(__name__)
+
+# Máximo de tokens verificados que cada worker mantiene en memoria
+TOKEN_CACHE_SIZE = 4096
+
+# Filas eliminadas por lote en la purga programada de tokens expirados
+PURGE_BATCH_SIZE = 5000
+
+# Secuencia que se incrementa al invalidar un access token: vacía la caché de tokens y fuerza
+# la resincronización de la lista de revocación en todos los workers
+TOKEN_EPOCH_SEQUENCE = 'brain_auth_token_epoch'
+
+# Prefijo de versión de los access tokens firmados: v1.<kid>.<payload>.<firma>
+SIGNED_TOKEN_PREFIX = 'v1'
+
+
+def hash_token(token):
+    """Digest SHA-256 (64 caracteres hexadecimales) con el que se guarda y busca un token."""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(data):
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
 
 class AuthToken(models.Model):
     _name= 'auth.token'
     _description='Token de autenticaciòn'
 
-    user_id = fields.Many2one('res.users', required=True)
-    access_token = fields.Char(string='Access Token', required=True)
-    refresh_token = fields.Char(string='Refresh Token', required=True)
+    user_id = fields.Many2one('res.users', required=True, index=True)
+    # Solo se guarda el digest de cada token; el valor en claro se entrega una única vez al cliente
+    access_token_hash = fields.Char(string='Digest del Access Token', size=64, required=True, copy=False)
+    refresh_token_hash = fields.Char(string='Digest del Refresh Token', size=64, required=True, copy=False)
+    access_token_signed = fields.Boolean(string='Access Token firmado', default=False)
     access_token_expiration = fields.Datetime(string='Expiración del Access Token', required=True)
-    refresh_token_expiration = fields.Datetime(string='Expiración del Refresh Token', required=True)
+    refresh_token_expiration = fields.Datetime(string='Expiración del Refresh Token', required=True, index=True)
+
+    # Las restricciones únicas crean los índices b-tree usados en las búsquedas por digest
+    _sql_constraints = [
+        ('access_token_hash_unique', 'unique(access_token_hash)', 'El access token debe ser único.'),
+        ('refresh_token_hash_unique', 'unique(refresh_token_hash)', 'El refresh token debe ser único.'),
+    ]
+
+    def init(self):
+        super().init()
+        self.env.cr.execute(f"CREATE SEQUENCE IF NOT EXISTS {TOKEN_EPOCH_SEQUENCE}")
 
     @api.model
     def create_token(self, user_id):
         """Crea y retorna un nuevo access y refresh token para el usuario."""
         # Generar access token y su fecha de expiración
-        access_token = secrets.token_urlsafe(64)
         access_expiration = datetime.now() + timedelta(minutes=30)
+        access_token, signed = self._issue_access_token(user_id, access_expiration)
 
         # Generar refresh token y su fecha de expiración
         refresh_token = secrets.token_urlsafe(64)
@@ -26,16 +74,18 @@ class AuthToken(models.Model):
         # Crear registro en el modelo
         token = self.create({
             'user_id': user_id,
-            'access_token': access_token,
-            'refresh_token': refresh_token,
+            'access_token_hash': hash_token(access_token),
+            'refresh_token_hash': hash_token(refresh_token),
+            'access_token_signed': signed,
             'access_token_expiration': access_expiration,
             'refresh_token_expiration': refresh_expiration,
         })
+        self._enforce_session_limit(user_id)
 
         return {
-            'access_token': token.access_token,
+            'access_token': access_token,
             'access_expiration': token.access_token_expiration,
-            'refresh_token': token.refresh_token,
+            'refresh_token': refresh_token,
             'refresh_expiration': token.refresh_token_expiration,
         }
 
@@ -43,7 +93,7 @@ class AuthToken(models.Model):
     def refresh_access_token(self, refresh_token):
         """Genera un nuevo access token utilizando el refresh token."""
         # Buscar el registro del refresh token con permisos elevados
-        token = self.sudo().search([('refresh_token', '=', refresh_token)], limit=1)
+        token = self.sudo().search([('refresh_token_hash', '=', hash_token(refresh_token))], limit=1)
 
         if not token:
             return {'error': 'Refresh token inválido.'}
@@ -52,14 +102,157 @@ class AuthToken(models.Model):
         if token.refresh_token_expiration < datetime.now():
             return {'error': 'Refresh token expirado.'}
 
+        # Invalidar el access token anterior en este worker y avisar al resto
+        self._invalidate_access_token(token)
+
         # Generar un nuevo access token
+        access_expiration = datetime.now() + timedelta(minutes=30)
+        access_token, signed = self._issue_access_token(token.user_id.id, access_expiration)
         token.sudo().write({
-            'access_token': secrets.token_urlsafe(64),
-            'access_token_expiration': datetime.now() + timedelta(minutes=30)
+            'access_token_hash': hash_token(access_token),
+            'access_token_signed': signed,
+            'access_token_expiration': access_expiration
         })
 
         return {
-            'access_token': token.access_token,
+            'access_token': access_token,
             'access_expiration': token.access_token_expiration,
             'refresh_expiration': token.refresh_token_expiration
         }
+
+    @api.model
+    def revoke_access_token(self, access_token):
+        """Cierra la sesión del access token: lo revoca y elimina su refresh token."""
+        token = self.sudo().search([('access_token_hash', '=', hash_token(access_token))], limit=1)
+        if not token:
+            return False
+        self._invalidate_access_token(token)
+        token.unlink()
+        return True
+
+    @api.model
+    def _enforce_session_limit(self, user_id):
+        """Elimina las sesiones más antiguas del usuario que excedan brain_api.max_sessions_per_user (0 = sin límite)."""
+        max_sessions = int(self.env['ir.config_parameter'].sudo().get_param('brain_api.max_sessions_per_user', 0))
+        if max_sessions <= 0:
+            return
+        old_tokens = self.sudo().search([('user_id', '=', user_id)], order='id desc', offset=max_sessions)
+        for token in old_tokens:
+            self._invalidate_access_token(token)
+        old_tokens.unlink()
+
+    @api.model
+    def _cron_purge_expired_tokens(self, batch_size=PURGE_BATCH_SIZE, auto_commit=True):
+        """Elimina por lotes las sesiones con refresh token expirado y las revocaciones vencidas."""
+        started = time.monotonic()
+        now = datetime.now()
+        purged = {}
+        for table, column in (('auth_token', 'refresh_token_expiration'), ('auth_token_revocation', 'expiration')):
+            purged[table] = 0
+            while True:
+                self.env.cr.execute(f"""
+                    DELETE FROM {table}
+                     WHERE id IN (SELECT id FROM {table} WHERE {column} < %s LIMIT %s)
+                """, [now, batch_size])
+                deleted = self.env.cr.rowcount
+                purged[table] += deleted
+                # Confirmar cada lote para no mantener bloqueos durante toda la purga
+                if auto_commit:
+                    self.env.cr.commit()
+                if deleted < batch_size:
+                    break
+
+        _logger.info("Purga de tokens: %s sesiones y %s revocaciones eliminadas en %.2fs",
+                     purged['auth_token'], purged['auth_token_revocation'], time.monotonic() - started)
+        return purged
+
+    def _invalidate_access_token(self, token):
+        """Invalida el access token actual del registro en todos los workers."""
+        if token.access_token_signed and token.access_token_expiration > datetime.now():
+            self.env['auth.token.revocation']._revoke(token.access_token_hash, token.access_token_expiration)
+        self._get_token_cache().pop(token.access_token_hash)
+        bump_sequence_after_commit(self.env, TOKEN_EPOCH_SEQUENCE)
+
+    @api.model
+    def _get_token_mode(self):
+        """Modo de emisión de access tokens: 'opaque' (por defecto) o 'signed'."""
+        return self.env['ir.config_parameter'].sudo().get_param('brain_api.token_mode', 'opaque')
+
+    @api.model
+    def _get_signing_key_ids(self):
+        """Ids de clave aceptados; el primero es el que se usa para firmar."""
+        key_ids = self.env['ir.config_parameter'].sudo().get_param('brain_api.token_key_ids', '1')
+        return [key_id.strip() for key_id in key_ids.split(',') if key_id.strip()]
+
+    @api.model
+    def _get_signing_key(self, key_id):
+        """Clave HMAC derivada del secreto de la base de datos y del id de clave."""
+        secret = self.env['ir.config_parameter'].sudo().get_param('database.secret')
+        return hmac.new(secret.encode('utf-8'), ('brain_api.access_token.' + key_id).encode('utf-8'),
+                        hashlib.sha256).digest()
+
+    @api.model
+    def _issue_access_token(self, user_id, expiration):
+        """Genera un access token según el modo configurado. Retorna (token, firmado)."""
+        if self._get_token_mode() != 'signed':
+            return secrets.token_urlsafe(64), False
+
+        key_id = self._get_signing_key_ids()[0]
+        payload = _b64encode(json.dumps({
+            'uid': user_id,
+            'exp': int(expiration.timestamp()),
+            'jti': secrets.token_urlsafe(8),
+        }, separators=(',', ':')).encode('utf-8'))
+        signing_input = '.'.join((SIGNED_TOKEN_PREFIX, key_id, payload))
+        signature = hmac.new(self._get_signing_key(key_id), signing_input.encode('utf-8'), hashlib.sha256).digest()
+        return signing_input + '.' + _b64encode(signature), True
+
+    @api.model
+    def _get_signed_token_user_id(self, access_token):
+        """Valida un access token firmado sin consultar la tabla auth.token."""
+        parts = access_token.split('.')
+        if len(parts) != 4 or parts[0] != SIGNED_TOKEN_PREFIX or parts[1] not in self._get_signing_key_ids():
+            return False
+
+        signing_input = '.'.join(parts[:3])
+        expected = hmac.new(self._get_signing_key(parts[1]), signing_input.encode('utf-8'), hashlib.sha256).digest()
+        try:
+            if not hmac.compare_digest(expected, _b64decode(parts[3])):
+                return False
+            claims = json.loads(_b64decode(parts[2]))
+        except ValueError:
+            return False
+
+        if claims.get('exp', 0) <= time.time():
+            return False
+        if hash_token(access_token) in self.env['auth.token.revocation']._get_revoked_hashes():
+            return False
+        return claims.get('uid') or False
+
+    @api.model
+    def _get_token_cache(self):
+        """Caché del worker digest -> user_id, invalidada con la época de tokens."""
+        cache = get_cache('auth.token', self.env.cr.dbname, max_size=TOKEN_CACHE_SIZE)
+        cache.check_signature(sequence_signature(self.env, TOKEN_EPOCH_SEQUENCE))
+        return cache
+
+    @api.model
+    def _get_access_token_user_id(self, access_token):
+        """Devuelve el id del usuario de un access token vigente, o False si no es válido."""
+        if access_token.startswith(SIGNED_TOKEN_PREFIX + '.'):
+            return self._get_signed_token_user_id(access_token)
+
+        token_hash = hash_token(access_token)
+        cache = self._get_token_cache()
+        user_id = cache.get(token_hash)
+        if user_id:
+            return user_id
+
+        token = self.sudo().search([('access_token_hash', '=', token_hash)], limit=1)
+        now = fields.Datetime.now()
+        if not token or token.access_token_expiration < now:
+            return False
+
+        # La entrada expira junto con el access token
+        cache.set(token_hash, token.user_id.id, ttl=(token.access_token_expiration - now).total_seconds())
+        return token.user_id.id
@@ -0,0 +1,53 @@
+from odoo import models, fields, api
+from datetime import datetime
+from ..tools.cache import sequence_signature
+from .auth_token import TOKEN_EPOCH_SEQUENCE
+import threading
+import time
+
+# Segundos máximos entre sincronizaciones de la lista de revocación en cada worker
+REVOCATION_SYNC_INTERVAL = 30
+
+# Segundos durante los que cada worker reutiliza su lectura de la época de tokens. La verificación
+# de un token firmado no consulta la base de datos dentro de ese intervalo; a cambio, una revocación
+# hecha en otro worker puede tardar hasta este tiempo en aplicarse aquí (en el mismo worker, nunca)
+TOKEN_EPOCH_CHECK_INTERVAL = 5
+
+# Lista de revocación del worker por base de datos: {dbname: {'hashes', 'synced_at', 'signature'}}
+_revocations = {}
+_revocations_lock = threading.Lock()
+
+
+class AuthTokenRevocation(models.Model):
+    _name = 'auth.token.revocation'
+    _description = 'Access token firmado revocado'
+
+    token_hash = fields.Char(string='Digest del Access Token', size=64, required=True, index=True)
+    expiration = fields.Datetime(string='Expiración del Access Token', required=True, index=True)
+
+    @api.model
+    def _revoke(self, token_hash, expiration):
+        """Revoca un access token firmado hasta su expiración natural."""
+        self.sudo().create({'token_hash': token_hash, 'expiration': expiration})
+        state = _revocations.get(self.env.cr.dbname)
+        if state:
+            state['hashes'] = state['hashes'] | {token_hash}
+
+    @api.model
+    def _get_revoked_hashes(self):
+        """Digests revocados aún vigentes, sincronizados periódicamente o cuando cambia la época de tokens."""
+        dbname = self.env.cr.dbname
+        signature = sequence_signature(self.env, TOKEN_EPOCH_SEQUENCE, max_age=TOKEN_EPOCH_CHECK_INTERVAL)
+        state = _revocations.get(dbname)
+        if (state is None or state['signature'] != signature
+                or time.monotonic() - state['synced_at'] > REVOCATION_SYNC_INTERVAL):
+            self.env.cr.execute(
+                "SELECT token_hash FROM auth_token_revocation WHERE expiration > %s", [datetime.now()])
+            state = {
+                'hashes': frozenset(row[0] for row in self.env.cr.fetchall()),
+                'synced_at': time.monotonic(),
+                'signature': signature,
+            }
+            with _revocations_lock:
+                _revocations[dbname] = state
+        return state['hashes']
@@ -1,4 +1,5 @@
 from odoo import models, fields
+from odoo.tools.sql import create_index
 
 class CrmLead(models.Model):
     _inherit = 'crm.lead'
@@ -40,3 +41,8 @@ class CrmLead(models.Model):
     brain_backoffice = fields.Many2one( 'res.users',
         string="Backoffice",
         domain=lambda self: [('groups_id', 'in', self.env.ref('sales_team.group_sale_manager').ids)])
+
+    def init(self):
+        super().init()
+        # Índice para la paginación por cursor de /api/leads
+        create_index(self.env.cr, 'crm_lead_create_date_id_index', self._table, ['create_date DESC', 'id DESC'])
@@ -0,0 +1,104 @@
+from odoo import models, fields, api
+from odoo.tools.sql import create_index
+import logging
+import time
+
+_logger = logging.getLogger(__name__)
+
+# Trabajos procesados por ejecución del cron de envío
+EMAIL_JOB_BATCH_SIZE = 50
+
+# Intentos antes de marcar un envío como fallido
+EMAIL_JOB_MAX_ATTEMPTS = 3
+
+# Nombre técnico del módulo, para referenciar su cron (odoo.addons.<módulo>.models...)
+MODULE = __name__.split('.')[2]
+
+
+class BrainEmailJob(models.Model):
+    _name = 'brain.email.job'
+    _description = 'Envío de cotización por email en cola'
+    _order = 'id'
+
+    sale_order_id = fields.Many2one('sale.order', required=True, ondelete='cascade', index=True)
+    user_id = fields.Many2one('res.users', required=True, ondelete='cascade')
+    state = fields.Selection([
+        ('pending', 'Pendiente'),
+        ('done', 'Enviado'),
+        ('failed', 'Fallido'),
+    ], default='pending', required=True)
+    attempts = fields.Integer(string='Intentos', default=0)
+    error = fields.Text(string='Último error')
+    date_done = fields.Datetime(string='Fecha de envío')
+
+    def init(self):
+        super().init()
+        # Índice parcial: el cron solo busca trabajos pendientes
+        create_index(self.env.cr, 'brain_email_job_pending_index', self._table, ['id'], where="state = 'pending'")
+
+    @api.model
+    def _enqueue(self, sale_order, user_id):
+        """Encola el envío de la cotización; reutiliza el trabajo pendiente de la misma orden si existe."""
+        job = self.sudo().search([('sale_order_id', '=', sale_order.id), ('state', '=', 'pending')], limit=1)
+        if not job:
+            job = self.sudo().create({'sale_order_id': sale_order.id, 'user_id': user_id})
+        # Despierta el cron en cuanto se confirme la transacción en lugar de esperar a su intervalo
+        self.env.ref(f'{MODULE}.ir_cron_process_email_jobs').sudo()._trigger()
+        return job
+
+    def _send(self):
+        """Envía por email la cotización de los trabajos (una sola vez por orden) como su usuario."""
+        order = self.sale_order_id.with_user(self[0].user_id)
+        template = order._find_mail_template()
+        if not template:
+            raise ValueError('La orden no tiene plantilla de email.')
+        # mark_so_as_sent pasa la cotización de borrador a enviada, como el asistente de envío
+        order.with_context(mark_so_as_sent=True).message_post_with_source(
+            template,
+            email_layout_xmlid='mail.mail_notification_layout_with_responsible_signature',
+            subtype_xmlid='mail.mt_comment',
+        )
+
+    @api.model
+    def _cron_process_jobs(self, batch_size=EMAIL_JOB_BATCH_SIZE, auto_commit=True):
+        """Procesa un lote de envíos pendientes.
+
+        Los trabajos se reservan con FOR UPDATE SKIP LOCKED para que varios workers de cron no los
+        repitan. Los trabajos de una misma orden comparten un único render de plantilla y PDF.
+        """
+        started = time.monotonic()
+        self.env.cr.execute("""
+            SELECT id FROM brain_email_job
+             WHERE state = 'pending'
+             ORDER BY id
+             LIMIT %s
+             FOR UPDATE SKIP LOCKED
+        """, [batch_size])
+        jobs = self.sudo().browse([row[0] for row in self.env.cr.fetchall()])
+
+        sent = failed = 0
+        for sale_order, order_jobs in jobs.grouped('sale_order_id').items():
+            try:
+                with self.env.cr.savepoint():
+                    order_jobs._send()
+                order_jobs.write({'state': 'done', 'date_done': fields.Datetime.now(), 'error': False})
+                sent += len(order_jobs)
+            except Exception as e:
+                _logger.warning("Envío de la orden %s fallido: %s", sale_order.id, e)
+                for job in order_jobs:
+                    job.write({
+                        'attempts': job.attempts + 1,
+                        'error': str(e),
+                        'state': 'failed' if job.attempts + 1 >= EMAIL_JOB_MAX_ATTEMPTS else 'pending',
+                    })
+                failed += len(order_jobs)
+            # Confirmar cada orden: un fallo posterior no reenvía los emails ya enviados
+            if auto_commit:
+                self.env.cr.commit()
+
+        if len(jobs) == batch_size:
+            # Quedan trabajos: volver a ejecutar el cron sin esperar al intervalo
+            self.env.ref(f'{MODULE}.ir_cron_process_email_jobs').sudo()._trigger()
+        if jobs:
+            _logger.info("Cola de emails: %s enviados y %s fallidos en %.2fs", sent, failed, time.monotonic() - started)
+        return {'sent': sent, 'failed': failed}
@@ -0,0 +1,132 @@
+from odoo import models, fields, api
+from datetime import datetime, timedelta
+from psycopg2 import errors
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Horas por defecto durante las que una respuesta puede repetirse, configurable con brain_api.idempotency_ttl_hours
+DEFAULT_IDEMPOTENCY_TTL_HOURS = 24
+
+# Código registrado mientras la petición que reservó la clave sigue en curso
+STATUS_PENDING = 0
+
+# Vigencia de una reserva pendiente: pasado este tiempo (p. ej. si el worker murió) la clave puede
+# reservarse de nuevo
+PENDING_CLAIM_TTL = timedelta(minutes=10)
+
+
+class BrainIdempotencyKey(models.Model):
+    _name = 'brain.idempotency.key'
+    _description = 'Respuesta registrada por Idempotency-Key'
+
+    user_id = fields.Many2one('res.users', required=True, ondelete='cascade')
+    key = fields.Char(string='Idempotency-Key', size=255, required=True)
+    fingerprint = fields.Char(string='Huella de la petición', size=64, required=True)
+    # 0 (STATUS_PENDING) mientras la petición original sigue en curso
+    status = fields.Integer(string='Código HTTP', required=True)
+    body = fields.Text(string='Cuerpo de la respuesta')
+    content_type = fields.Char(string='Content-Type')
+    expiration = fields.Datetime(string='Expiración', required=True, index=True)
+
+    # La restricción única crea el índice (user_id, key) usado en cada búsqueda
+    _sql_constraints = [
+        ('user_key_unique', 'unique(user_id, key)', 'La Idempotency-Key ya fue usada por este usuario.'),
+    ]
+
+    @api.model
+    def _claim(self, user_id, key, fingerprint):
+        """Reserva la clave para la petición actual antes de ejecutarla.
+
+        La reserva se inserta y confirma en un cursor propio: la transacción de la petición tiene
+        su snapshot fijado desde antes (REPEATABLE READ) y no vería la fila de otra petición
+        confirmada después. Una clave expirada aún no purgada se reutiliza.
+
+        Retorna None si la clave quedó reservada para esta petición; si no, la fila existente como
+        dict (fingerprint, status, body, content_type), con status STATUS_PENDING mientras la
+        petición que la reservó sigue en curso.
+        """
+        now = datetime.now()
+        params = {
+            'user_id': user_id,
+            'key': key,
+            'fingerprint': fingerprint,
+            'status': STATUS_PENDING,
+            'expiration': now + PENDING_CLAIM_TTL,
+            'now': now,
+        }
+        try:
+            with self.env.registry.cursor() as cr:
+                cr.execute("""
+                    INSERT INTO brain_idempotency_key AS k
+                           (user_id, key, fingerprint, status, expiration,
+                            create_uid, create_date, write_uid, write_date)
+                    VALUES (%(user_id)s, %(key)s, %(fingerprint)s, %(status)s, %(expiration)s,
+                            %(user_id)s, %(now)s, %(user_id)s, %(now)s)
+                    ON CONFLICT (user_id, key) DO UPDATE
+                       SET fingerprint = EXCLUDED.fingerprint, status = EXCLUDED.status, body = NULL,
+                           content_type = NULL, expiration = EXCLUDED.expiration, write_date = EXCLUDED.write_date
+                     WHERE k.expiration <= %(now)s
+                    RETURNING id
+                """, params)
+                if cr.fetchone():
+                    return None
+                cr.execute("""
+                    SELECT fingerprint, status, body, content_type
+                      FROM brain_idempotency_key
+                     WHERE user_id = %(user_id)s AND key = %(key)s
+                """, params)
+                return cr.dictfetchone()
+        except errors.SerializationFailure:
+            # La fila en conflicto la acaba de insertar otra petición con la misma clave
+            return {'fingerprint': fingerprint, 'status': STATUS_PENDING, 'body': None, 'content_type': None}
+
+    @api.model
+    def _finish(self, user_id, key, response):
+        """Registra la respuesta cuando la transacción de la petición confirma.
+
+        Las respuestas 5xx y las transmitidas en streaming liberan la clave en lugar de registrarse,
+        igual que una transacción revertida: el cliente puede reintentar con la misma clave.
+        """
+        cr = self.env.cr
+        if response.status_code >= 500 or response.direct_passthrough:
+            cr.postcommit.add(lambda: self._release(user_id, key))
+        else:
+            ttl = int(self.env['ir.config_parameter'].sudo().get_param(
+                'brain_api.idempotency_ttl_hours', DEFAULT_IDEMPOTENCY_TTL_HOURS))
+            params = {
+                'user_id': user_id,
+                'key': key,
+                'status': response.status_code,
+                'body': response.get_data(as_text=True),
+                'content_type': response.headers.get('Content-Type'),
+                'expiration': datetime.now() + timedelta(hours=ttl),
+                'pending': STATUS_PENDING,
+            }
+            registry = self.env.registry
+
+            @cr.postcommit.add
+            def store():
+                with registry.cursor() as store_cr:
+                    store_cr.execute("""
+                        UPDATE brain_idempotency_key
+                           SET status = %(status)s, body = %(body)s, content_type = %(content_type)s,
+                               expiration = %(expiration)s, write_date = now() at time zone 'UTC'
+                         WHERE user_id = %(user_id)s AND key = %(key)s AND status = %(pending)s
+                    """, params)
+        cr.postrollback.add(lambda: self._release(user_id, key))
+
+    @api.model
+    def _release(self, user_id, key):
+        """Elimina la reserva pendiente de la clave para que el cliente pueda reintentar."""
+        with self.env.registry.cursor() as cr:
+            cr.execute("""
+                DELETE FROM brain_idempotency_key
+                 WHERE user_id = %s AND key = %s AND status = %s
+            """, [user_id, key, STATUS_PENDING])
+
+    @api.model
+    def _cron_purge_expired_keys(self):
+        """Elimina las respuestas registradas cuya ventana de repetición terminó."""
+        self.env.cr.execute("DELETE FROM brain_idempotency_key WHERE expiration <= %s", [datetime.now()])
+        _logger.info("Purga de Idempotency-Key: %s claves expiradas eliminadas", self.env.cr.rowcount)
@@ -0,0 +1,40 @@
+from odoo import models, fields, api
+import base64
+
+
+class BrainImageChecksumMixin(models.AbstractModel):
+    _name = 'brain.image.checksum.mixin'
+    _description = 'Checksum de la imagen principal'
+
+    # Checksum del adjunto de image_1920: indica si hay imagen sin leer el binario y versiona las URLs
+    brain_image_checksum = fields.Char(string='Checksum de la imagen', compute='_compute_brain_image_checksum',
+                                       store=True)
+
+    @api.depends('image_1920')
+    def _compute_brain_image_checksum(self):
+        # Registros nuevos (NewId, p. ej. en un onchange de formulario): la imagen editada solo está
+        # en memoria, así que el checksum se calcula desde su valor, igual que lo haría ir.attachment
+        stored = self.filtered('id')
+        for record in self - stored:
+            image = record.image_1920
+            record.brain_image_checksum = (
+                self.env['ir.attachment']._compute_checksum(base64.b64decode(image)) if image else False)
+
+        attachments = self.env['ir.attachment'].sudo().search_read([
+            ('res_model', '=', self._name),
+            ('res_field', '=', 'image_1920'),
+            ('res_id', 'in', stored.ids),
+        ], ['res_id', 'checksum']) if stored else []
+        checksums = {attachment['res_id']: attachment['checksum'] for attachment in attachments}
+        for record in stored:
+            record.brain_image_checksum = checksums.get(record.id, False)
+
+    def _get_image_url(self, prefix, suffix=''):
+        """URL de la imagen versionada con su checksum (?unique=), o None si no hay imagen."""
+        self.ensure_one()
+        return image_url(prefix, self.id, self.brain_image_checksum, suffix)
+
+
+def image_url(prefix, record_id, checksum, suffix=''):
+    """URL `prefix + id + suffix` versionada con el checksum de la imagen; None si no hay imagen."""
+    return f"{prefix}{record_id}{suffix}?unique={checksum[:16]}" if checksum else None
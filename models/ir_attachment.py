@@ -0,0 +1,96 @@
+from odoo import models, api
+from odoo.tools import config
+import hashlib
+import os
+import shutil
+import tempfile
+
+# Bytes leídos y escritos por bloque al copiar archivos subidos
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class IrAttachment(models.Model):
+    _inherit = 'ir.attachment'
+
+    @api.model
+    def _brain_upload_dir(self):
+        """Directorio de archivos subidos en curso, dentro del filestore para poder moverlos sin copiarlos."""
+        path = os.path.join(config.filestore(self.env.cr.dbname), 'brain_api_uploads')
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    @api.model
+    def _brain_write_stream(self, stream, limit=None):
+        """Copia `stream` a un archivo temporal por bloques calculando el checksum al vuelo.
+
+        Retorna (ruta, checksum, tamaño). Lanza ValueError si se superan `limit` bytes.
+        """
+        sha = hashlib.sha1()
+        size = 0
+        fd, path = tempfile.mkstemp(dir=self._brain_upload_dir(), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                while True:
+                    chunk = stream.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if limit is not None and size > limit:
+                        raise ValueError('El archivo supera el tamaño máximo permitido.')
+                    sha.update(chunk)
+                    fp.write(chunk)
+        except Exception:
+            os.unlink(path)
+            raise
+        return path, sha.hexdigest(), size
+
+    @api.model
+    def _brain_create_from_file(self, path, checksum, size, vals, keep_source=False):
+        """Crea un adjunto por referencia a `path`, que se mueve al filestore sin volver a leerse.
+
+        `checksum` es el SHA-1 del contenido, igual que el que calcula ir.attachment. Con
+        `keep_source` el archivo se enlaza (o copia) en lugar de moverse y `path` se conserva,
+        para que el llamador lo elimine solo tras el commit.
+        """
+        if self._storage() != 'file':
+            # Almacenamiento en base de datos: no hay archivo al que referenciar
+            with open(path, 'rb') as fp:
+                vals = dict(vals, raw=fp.read())
+            if not keep_source:
+                os.unlink(path)
+            return self.create(vals)
+
+        fname = f'{checksum[:2]}/{checksum}'
+        full_path = self._full_path(fname)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        if os.path.exists(full_path):
+            # Mismo contenido ya presente en el filestore (deduplicado por checksum)
+            if not keep_source:
+                os.unlink(path)
+        else:
+            if keep_source:
+                self._brain_link_file(path, full_path)
+            else:
+                os.replace(path, full_path)
+            self._mark_for_gc(fname)
+
+        # create() descarta store_fname/checksum/file_size si no recibe el contenido
+        attachment = self.create(vals)
+        self.env.cr.execute(
+            "UPDATE ir_attachment SET store_fname = %s, checksum = %s, file_size = %s WHERE id = %s",
+            [fname, checksum, size, attachment.id])
+        attachment.invalidate_recordset(['store_fname', 'checksum', 'file_size'])
+        return attachment
+
+    @api.model
+    def _brain_link_file(self, path, full_path):
+        """Enlaza `path` en `full_path` sin copiar datos; si el sistema de archivos no admite
+        enlaces, copia a un temporal y lo renombra para no exponer un archivo a medio escribir."""
+        try:
+            os.link(path, full_path)
+        except FileExistsError:
+            pass
+        except OSError:
+            tmp_path = f'{full_path}.{os.getpid()}.tmp'
+            shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, full_path)
@@ -0,0 +1,18 @@
+from odoo import models, api
+
+
+class IrModelAccess(models.Model):
+    _inherit = 'ir.model.access'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self.env['res.groups']._brain_bump_access_epoch()
+        return super().create(vals_list)
+
+    def write(self, vals):
+        self.env['res.groups']._brain_bump_access_epoch()
+        return super().write(vals)
+
+    def unlink(self):
+        self.env['res.groups']._brain_bump_access_epoch()
+        return super().unlink()
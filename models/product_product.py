@@ -0,0 +1,90 @@
+from odoo import models, api
+from odoo.tools.sql import create_index
+from ..tools.cache import bump_sequence_after_commit, get_cache, sequence_signature
+
+# Plantillas cuyo índice de variantes mantiene cada worker en memoria
+VARIANT_INDEX_CACHE_SIZE = 2048
+
+# Campos cuyo cambio altera la resolución (plantilla, valores de variante) -> producto
+VARIANT_INDEX_FIELDS = {'product_tmpl_id', 'product_template_variant_value_ids', 'company_id', 'active'}
+
+# Secuencia que se incrementa cuando cambian las variantes: invalida el índice en todos los workers
+VARIANT_INDEX_SEQUENCE = 'brain_variant_index_epoch'
+
+
+class ProductProduct(models.Model):
+    _inherit = 'product.product'
+
+    def init(self):
+        super().init()
+        # Índice para la paginación por cursor de /api/products
+        create_index(self.env.cr, 'product_product_create_date_id_index', self._table, ['create_date DESC', 'id DESC'])
+        self.env.cr.execute(f"CREATE SEQUENCE IF NOT EXISTS {VARIANT_INDEX_SEQUENCE}")
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        products = super().create(vals_list)
+        self._invalidate_variant_index()
+        return products
+
+    def write(self, vals):
+        res = super().write(vals)
+        if VARIANT_INDEX_FIELDS.intersection(vals):
+            self._invalidate_variant_index()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self._invalidate_variant_index()
+        return res
+
+    @api.model
+    def _get_variant_index_cache(self):
+        """Caché del worker (compañía, plantilla) -> índice de variantes, invalidada entre workers
+        con su propia secuencia."""
+        cache = get_cache('variant_index', self.env.cr.dbname, max_size=VARIANT_INDEX_CACHE_SIZE)
+        cache.check_signature(sequence_signature(self.env, VARIANT_INDEX_SEQUENCE))
+        return cache
+
+    @api.model
+    def _invalidate_variant_index(self):
+        """Vacía el índice de este worker ahora y el de los demás tras el commit."""
+        get_cache('variant_index', self.env.cr.dbname, max_size=VARIANT_INDEX_CACHE_SIZE).clear()
+        bump_sequence_after_commit(self.env, VARIANT_INDEX_SEQUENCE)
+
+    @api.model
+    def _resolve_variants(self, company_id, combinations):
+        """Resuelve pares (plantilla, ids de valores de variante) a ids de product.product.
+
+        Las plantillas que no están en caché se indexan juntas con una sola búsqueda. Sin valores
+        se devuelve la primera variante de la plantilla; con valores, la variante cuyo conjunto de
+        valores coincide exactamente. Retorna {(plantilla, frozenset(valores)): id o False}.
+        """
+        cache = self._get_variant_index_cache()
+        indexes = {}
+        for template_id, _value_ids in combinations:
+            if template_id not in indexes:
+                indexes[template_id] = cache.get((company_id, template_id))
+
+        missing = [template_id for template_id, index in indexes.items() if index is None]
+        if missing:
+            products = self.sudo().with_company(company_id).search([
+                ('product_tmpl_id', 'in', missing),
+                '|',
+                ('company_id', '=', company_id),
+                ('company_id', '=', False)
+            ])
+            built = {template_id: {} for template_id in missing}
+            # search() respeta el orden por defecto: la primera variante encontrada gana
+            for row in products.read(['product_tmpl_id', 'product_template_variant_value_ids'], load=None):
+                index = built[row['product_tmpl_id']]
+                index.setdefault(None, row['id'])
+                index.setdefault(frozenset(row['product_template_variant_value_ids']), row['id'])
+            for template_id, index in built.items():
+                cache.set((company_id, template_id), index)
+            indexes.update(built)
+
+        return {
+            (template_id, value_ids): indexes[template_id].get(value_ids or None, False)
+            for template_id, value_ids in combinations
+        }
@@ -0,0 +1,13 @@
+from odoo import models
+
+
+class ProductTemplate(models.Model):
+    _name = 'product.template'
+    _inherit = ['product.template', 'brain.image.checksum.mixin']
+
+    def write(self, vals):
+        res = super().write(vals)
+        # company_id de las variantes es un related almacenado: no pasa por product.product.write
+        if 'company_id' in vals:
+            self.env['product.product']._invalidate_variant_index()
+        return res
@@ -0,0 +1,32 @@
+from odoo import models, api
+from ..tools.cache import bump_sequence_after_commit
+
+# Secuencia que se incrementa cuando cambian grupos, pertenencias o permisos de acceso:
+# invalida las cachés de permisos de la API en todos los workers
+ACCESS_EPOCH_SEQUENCE = 'brain_api_access_epoch'
+
+
+class ResGroups(models.Model):
+    _inherit = 'res.groups'
+
+    def init(self):
+        super().init()
+        self.env.cr.execute(f"CREATE SEQUENCE IF NOT EXISTS {ACCESS_EPOCH_SEQUENCE}")
+
+    @api.model
+    def _brain_bump_access_epoch(self):
+        """Invalida las cachés de permisos de la API tras el commit de la transacción actual."""
+        bump_sequence_after_commit(self.env, ACCESS_EPOCH_SEQUENCE)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self._brain_bump_access_epoch()
+        return super().create(vals_list)
+
+    def write(self, vals):
+        self._brain_bump_access_epoch()
+        return super().write(vals)
+
+    def unlink(self):
+        self._brain_bump_access_epoch()
+        return super().unlink()
@@ -0,0 +1,12 @@
+from odoo import models
+from odoo.tools.sql import create_index
+
+
+class ResPartner(models.Model):
+    _name = 'res.partner'
+    _inherit = ['res.partner', 'brain.image.checksum.mixin']
+
+    def init(self):
+        super().init()
+        # Índice para la paginación por cursor de /api/partners
+        create_index(self.env.cr, 'res_partner_create_date_id_index', self._table, ['create_date DESC', 'id DESC'])
@@ -35,4 +35,10 @@ class ResUsers(models.Model):
                 'name': user.name,
                 'email': user.email or None# Asegurar que existe el correo o proporcionar un valor por defecto
             }
-        }
\ No newline at end of file
+        }
+
+    def write(self, vals):
+        # Los campos reificados de grupos (in_group_*, sel_groups_*) también cambian la pertenencia
+        if any(name == 'groups_id' or name.startswith(('in_group_', 'sel_groups_')) for name in vals):
+            self.env['res.groups']._brain_bump_access_epoch()
+        return super().write(vals)
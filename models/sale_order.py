@@ -0,0 +1,37 @@
+from odoo import models
+from odoo.tools.sql import create_index
+
+# Campos que mueven una orden a otra fila del resumen diario sin que el día anterior se detecte por write_date
+ROLLUP_KEY_FIELDS = {'date_order', 'company_id', 'user_id'}
+
+# Campos cuyo cambio altera los reportes de ventas en caché
+REPORT_FIELDS = ROLLUP_KEY_FIELDS | {'state', 'order_line', 'amount_total'}
+
+
+class SaleOrder(models.Model):
+    _inherit = 'sale.order'
+
+    def init(self):
+        super().init()
+        # Índice para la paginación por cursor de /api/sale_orders
+        create_index(self.env.cr, 'sale_order_date_order_id_index', self._table, ['date_order DESC', 'id DESC'])
+        # Índice para detectar las órdenes modificadas al refrescar el resumen diario de ventas
+        create_index(self.env.cr, 'sale_order_write_date_index', self._table, ['write_date'])
+
+    def write(self, vals):
+        Rollup = self.env['brain.sale.report.daily']
+        if ROLLUP_KEY_FIELDS.intersection(vals):
+            Rollup._mark_dirty(order.date_order.date() for order in self if order.date_order)
+        if REPORT_FIELDS.intersection(vals):
+            Rollup._bump_generation(self)
+        res = super().write(vals)
+        if 'date_order' in vals:
+            # También la fecha nueva, por si la orden pasa a los días en vivo
+            Rollup._bump_generation(self)
+        return res
+
+    def unlink(self):
+        Rollup = self.env['brain.sale.report.daily']
+        Rollup._mark_dirty(order.date_order.date() for order in self if order.date_order)
+        Rollup._bump_generation(self)
+        return super().unlink()
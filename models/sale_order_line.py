@@ -0,0 +1,49 @@
+from odoo import models, fields, api
+from odoo.tools.sql import create_index
+
+# Campos de línea que alimentan los reportes de ventas (cantidades, importes, producto y orden)
+LINE_REPORT_FIELDS = {
+    'order_id', 'product_id', 'product_uom_qty', 'price_unit', 'discount', 'tax_id', 'price_subtotal',
+    'state', 'company_id', 'salesman_id',
+}
+
+
+class SaleOrderLine(models.Model):
+    _inherit = 'sale.order.line'
+
+    # Fecha de la orden en la propia línea: los reportes filtran por rango sin unir sale_order.
+    # state, company_id y salesman_id ya son related almacenados de la orden en sale.
+    brain_date_order = fields.Datetime(related='order_id.date_order', store=True, string='Fecha de la orden')
+
+    def init(self):
+        super().init()
+        # Índice para detectar las líneas modificadas al refrescar el resumen diario de ventas
+        create_index(self.env.cr, 'sale_order_line_write_date_index', self._table, ['write_date'])
+        # Índice de cobertura de los reportes: rango de fechas de las líneas confirmadas con todo lo
+        # que agregan, para recorridos solo de índice
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS sale_order_line_brain_report_index
+                ON sale_order_line (brain_date_order, company_id, salesman_id)
+                INCLUDE (product_id, order_id, product_uom_qty, price_subtotal)
+             WHERE state = 'sale'
+        """)
+
+    # Los cambios de líneas alteran los importes de su orden y con ello los reportes en caché en vivo
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        self.env['brain.sale.report.daily']._bump_generation(lines.order_id)
+        return lines
+
+    def write(self, vals):
+        if LINE_REPORT_FIELDS.intersection(vals):
+            self.env['brain.sale.report.daily']._bump_generation(self.order_id)
+        res = super().write(vals)
+        if 'order_id' in vals:
+            # También la orden nueva
+            self.env['brain.sale.report.daily']._bump_generation(self.order_id)
+        return res
+
+    def unlink(self):
+        self.env['brain.sale.report.daily']._bump_generation(self.order_id)
+        return super().unlink()
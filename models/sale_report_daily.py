@@ -0,0 +1,151 @@
+from odoo import models, fields, api
+from datetime import timedelta
+from ..tools.cache import bump_sequence_after_commit
+import logging
+import time
+
+_logger = logging.getLogger(__name__)
+
+# Parámetro con el instante de la última actualización del resumen diario
+LAST_RUN_PARAM = 'brain_api.sales_rollup_last_run'
+
+# Secuencia que se incrementa cuando cambia una orden de los días calculados en vivo (desde la
+# última actualización del resumen): invalida los reportes en caché que incluyen esos días
+GENERATION_SEQUENCE = 'brain_sale_report_generation'
+
+# Margen hacia atrás al buscar cambios: cubre transacciones que confirmaron después de la última ejecución
+ROLLUP_OVERLAP = timedelta(minutes=10)
+
+# Filas del resumen para los días indicados, agregadas desde las órdenes confirmadas.
+# Las filas sin product_id llevan los totales por orden (amount_total, número de órdenes);
+# las filas con product_id, cantidades y subtotales de línea.
+ROLLUP_QUERY = """
+    INSERT INTO brain_sale_report_daily
+           (date, company_id, user_id, product_id, quantity, subtotal, amount_total, order_count)
+    SELECT d.day, so.company_id, so.user_id, NULL, 0, 0, SUM(so.amount_total), COUNT(*)
+      FROM unnest(%(days)s::date[]) AS d(day)
+      JOIN sale_order so ON so.date_order >= d.day AND so.date_order < d.day + 1
+     WHERE so.state = 'sale'
+     GROUP BY d.day, so.company_id, so.user_id
+    UNION ALL
+    SELECT d.day, sol.company_id, sol.salesman_id, sol.product_id,
+           SUM(sol.product_uom_qty), SUM(sol.price_subtotal), 0, COUNT(DISTINCT sol.order_id)
+      FROM unnest(%(days)s::date[]) AS d(day)
+      JOIN sale_order_line sol ON sol.brain_date_order >= d.day AND sol.brain_date_order < d.day + 1
+     WHERE sol.state = 'sale'
+       AND sol.product_id IS NOT NULL
+     GROUP BY d.day, sol.company_id, sol.salesman_id, sol.product_id
+"""
+
+
+class BrainSaleReportDaily(models.Model):
+    _name = 'brain.sale.report.daily'
+    _description = 'Resumen diario de ventas'
+    _order = 'date desc'
+    _log_access = False
+
+    date = fields.Date(string='Día (UTC)', required=True, index=True)
+    company_id = fields.Many2one('res.company', ondelete='cascade')
+    user_id = fields.Many2one('res.users', string='Vendedor', ondelete='set null')
+    # Vacío en las filas de totales por orden
+    product_id = fields.Many2one('product.product', ondelete='cascade')
+    quantity = fields.Float(string='Cantidad')
+    subtotal = fields.Float(string='Subtotal')
+    amount_total = fields.Float(string='Total de órdenes')
+    order_count = fields.Integer(string='Órdenes')
+
+    def init(self):
+        super().init()
+        self.env.cr.execute(f"CREATE SEQUENCE IF NOT EXISTS {GENERATION_SEQUENCE}")
+
+    @api.model
+    def _get_generation(self):
+        """Generación actual de los datos de ventas en vivo, compartida por todos los workers."""
+        self.env.cr.execute(f"SELECT last_value FROM {GENERATION_SEQUENCE}")
+        return self.env.cr.fetchone()[0]
+
+    @api.model
+    def _get_last_run(self):
+        """Instante (texto) de la última actualización del resumen, o False si nunca se calculó.
+
+        Cambia con cada ejecución de _cron_refresh, así que identifica la versión del resumen.
+        """
+        return self.env['ir.config_parameter'].sudo().get_param(LAST_RUN_PARAM) or False
+
+    @api.model
+    def _bump_generation(self, orders):
+        """Invalida los reportes en caché en vivo si alguna de las órdenes cae en los días en vivo.
+
+        Los cambios en días anteriores solo llegan a los reportes con la siguiente actualización del
+        resumen, que cambia la clave de todos los reportes en caché. El incremento se hace tras el
+        commit: un lector concurrente no puede guardar en caché datos sin este cambio bajo la nueva
+        generación.
+        """
+        if self.env.cr.postcommit.data.get(GENERATION_SEQUENCE):
+            return
+        live_start = self._get_live_start()
+        if any(order.date_order and (live_start is None or order.date_order.date() >= live_start)
+               for order in orders):
+            bump_sequence_after_commit(self.env, GENERATION_SEQUENCE)
+
+    @api.model
+    def _get_live_start(self):
+        """Primer día que los reportes calculan en vivo: el resumen solo es completo para los días
+        anteriores a su última actualización. None si el resumen nunca se ha calculado."""
+        last_run = self._get_last_run()
+        return fields.Datetime.to_datetime(last_run).date() if last_run else None
+
+    @api.model
+    def _mark_dirty(self, days):
+        """Marca días a recalcular cuyo cambio no se detecta por write_date (órdenes que cambian de día,
+        de compañía o de vendedor, u órdenes eliminadas)."""
+        days = {day for day in days if day}
+        if days:
+            self.env.cr.execute("""
+                INSERT INTO brain_sale_report_dirty (date)
+                SELECT unnest(%s::date[])
+                ON CONFLICT (date) DO NOTHING
+            """, [sorted(days)])
+
+    @api.model
+    def _cron_refresh(self):
+        """Recalcula solo los días con órdenes o líneas modificadas desde la última ejecución."""
+        started = time.monotonic()
+        now = self.env.cr.now()
+        Param = self.env['ir.config_parameter'].sudo()
+        last_run = Param.get_param(LAST_RUN_PARAM)
+
+        if last_run:
+            since = fields.Datetime.to_datetime(last_run) - ROLLUP_OVERLAP
+            self.env.cr.execute("""
+                SELECT so.date_order::date FROM sale_order so WHERE so.write_date >= %(since)s
+                 UNION
+                SELECT sol.brain_date_order::date FROM sale_order_line sol WHERE sol.write_date >= %(since)s
+                 UNION
+                SELECT date FROM brain_sale_report_dirty
+            """, {'since': since})
+        else:
+            # Primera ejecución: todo el histórico
+            self.env.cr.execute("SELECT DISTINCT date_order::date FROM sale_order WHERE state = 'sale'")
+        days = [row[0] for row in self.env.cr.fetchall() if row[0]]
+
+        if days:
+            self.env.cr.execute("DELETE FROM brain_sale_report_daily WHERE date = ANY(%s::date[])", [days])
+            self.env.cr.execute(ROLLUP_QUERY, {'days': days})
+        self.env.cr.execute("DELETE FROM brain_sale_report_dirty")
+        Param.set_param(LAST_RUN_PARAM, fields.Datetime.to_string(now))
+
+        _logger.info("Resumen diario de ventas: %s días recalculados en %.2fs", len(days), time.monotonic() - started)
+        return len(days)
+
+
+class BrainSaleReportDirty(models.Model):
+    _name = 'brain.sale.report.dirty'
+    _description = 'Día pendiente de recalcular en el resumen diario de ventas'
+    _log_access = False
+
+    date = fields.Date(required=True)
+
+    _sql_constraints = [
+        ('date_unique', 'unique(date)', 'El día ya está marcado para recalcular.'),
+    ]
@@ -0,0 +1,152 @@
+from odoo import models, fields, api
+from datetime import datetime, timedelta
+from .ir_attachment import UPLOAD_CHUNK_SIZE
+import hashlib
+import logging
+import os
+import secrets
+
+_logger = logging.getLogger(__name__)
+
+# Tamaño máximo por defecto de un archivo subido (bytes), configurable con brain_api.max_upload_size
+DEFAULT_MAX_UPLOAD_SIZE = 50 * 1024 * 1024
+
+# Horas que una subida incompleta puede reanudarse antes de purgarse
+UPLOAD_SESSION_HOURS = 24
+
+
+class BrainUploadSession(models.Model):
+    _name = 'brain.upload.session'
+    _description = 'Subida de archivo por partes'
+
+    upload_id = fields.Char(string='Identificador', size=32, required=True, copy=False)
+    user_id = fields.Many2one('res.users', required=True, index=True, ondelete='cascade')
+    filename = fields.Char(string='Nombre del archivo', required=True)
+    mimetype = fields.Char(string='Tipo MIME')
+    size = fields.Integer(string='Tamaño total', required=True)
+    offset = fields.Integer(string='Bytes recibidos', default=0)
+    expiration = fields.Datetime(string='Expiración', required=True, index=True)
+
+    _sql_constraints = [
+        ('upload_id_unique', 'unique(upload_id)', 'El identificador de subida debe ser único.'),
+    ]
+
+    @api.model
+    def _get_max_upload_size(self):
+        return int(self.env['ir.config_parameter'].sudo().get_param(
+            'brain_api.max_upload_size', DEFAULT_MAX_UPLOAD_SIZE))
+
+    @api.model
+    def _start(self, user_id, filename, mimetype, size):
+        """Abre una sesión de subida reanudable y crea su archivo parcial vacío."""
+        if size <= 0 or size > self._get_max_upload_size():
+            raise ValueError('El tamaño del archivo no es válido o supera el máximo permitido.')
+        session = self.sudo().create({
+            'upload_id': secrets.token_hex(16),
+            'user_id': user_id,
+            'filename': filename,
+            'mimetype': mimetype,
+            'size': size,
+            'expiration': datetime.now() + timedelta(hours=UPLOAD_SESSION_HOURS),
+        })
+        open(session._part_path(), 'wb').close()
+        return session
+
+    @api.model
+    def _get_session(self, user_id, upload_id):
+        return self.sudo().search([
+            ('upload_id', '=', upload_id),
+            ('user_id', '=', user_id),
+            ('expiration', '>', datetime.now()),
+        ], limit=1)
+
+    def _part_path(self):
+        self.ensure_one()
+        return os.path.join(self.env['ir.attachment']._brain_upload_dir(), f'{self.upload_id}.part')
+
+    def _append(self, stream, offset):
+        """Añade un bloque leído de `stream` en la posición `offset`.
+
+        Retorna el nuevo offset. Lanza ValueError si el offset no coincide con los bytes ya
+        recibidos (el cliente debe consultar el estado y reanudar desde ahí) o si se excede el tamaño.
+        """
+        self.ensure_one()
+        # Serializa escrituras concurrentes sobre la misma sesión
+        self.env.cr.execute("SELECT id FROM brain_upload_session WHERE id = %s FOR UPDATE", [self.id])
+        self.invalidate_recordset(['offset'])
+        if offset != self.offset:
+            raise ValueError('El offset no coincide con los bytes recibidos.')
+
+        remaining = self.size - offset
+        with open(self._part_path(), 'r+b') as fp:
+            fp.truncate(offset)
+            fp.seek(offset)
+            while True:
+                chunk = stream.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                if remaining < 0:
+                    fp.truncate(offset)
+                    raise ValueError('El bloque excede el tamaño declarado del archivo.')
+                fp.write(chunk)
+        self.offset = self.size - remaining
+        return self.offset
+
+    def _is_complete(self):
+        self.ensure_one()
+        return self.offset == self.size
+
+    def _attach(self, res_model, res_id, res_field=False):
+        """Convierte la subida completa en un ir.attachment por referencia y cierra la sesión."""
+        self.ensure_one()
+        if not self._is_complete():
+            raise ValueError(f'La subida {self.upload_id} está incompleta.')
+
+        path = self._part_path()
+        # Checksum por bloques: el estado del hash no se comparte entre workers
+        sha = hashlib.sha1()
+        with open(path, 'rb') as fp:
+            for chunk in iter(lambda: fp.read(UPLOAD_CHUNK_SIZE), b''):
+                sha.update(chunk)
+
+        vals = {
+            'name': self.filename,
+            'res_model': res_model,
+            'res_id': res_id,
+            'type': 'binary',
+        }
+        if res_field:
+            vals['res_field'] = res_field
+        if self.mimetype:
+            vals['mimetype'] = self.mimetype
+        attachment = self.env['ir.attachment'].sudo()._brain_create_from_file(
+            path, sha.hexdigest(), self.size, vals, keep_source=True)
+        self._close()
+        return attachment
+
+    def _close(self):
+        """Elimina las sesiones. Sus archivos parciales se borran tras el commit: si la transacción
+        se revierte, la sesión y su archivo siguen disponibles para reintentar."""
+        paths = [session._part_path() for session in self]
+        self.sudo().unlink()
+
+        @self.env.cr.postcommit.add
+        def remove_parts():
+            for path in paths:
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+
+    @api.model
+    def _cron_purge_expired_sessions(self):
+        """Elimina las subidas abandonadas y sus archivos parciales."""
+        expired = self.sudo().search([('expiration', '<=', datetime.now())])
+        for session in expired:
+            try:
+                os.unlink(session._part_path())
+            except FileNotFoundError:
+                pass
+        _logger.info("Purga de subidas: %s sesiones expiradas eliminadas", len(expired))
+        expired.unlink()
@@ -0,0 +1,2 @@
+from . import test_sale_order_queries
+from . import test_sale_order_lines
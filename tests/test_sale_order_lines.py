@@ -0,0 +1,125 @@
+from odoo import Command
+from odoo.tests import TransactionCase, tagged
+
+from ..controllers.sale_order_controller import SaleOrderController
+
+
+@tagged('post_install', '-at_install')
+class TestSaleOrderLines(TransactionCase):
+    """El número de consultas al procesar líneas de orden no depende del número de líneas."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.controller = SaleOrderController()
+        cls.company = cls.env.company
+        cls.partner = cls.env['res.partner'].create({'name': 'Cliente API'})
+        attribute = cls.env['product.attribute'].create({
+            'name': 'Talla API',
+            'value_ids': [Command.create({'name': name}) for name in ('S', 'M', 'L', 'XL', 'XXL')],
+        })
+        cls.template = cls.env['product.template'].create({
+            'name': 'Camisa API',
+            'list_price': 10.0,
+            'attribute_line_ids': [Command.create({
+                'attribute_id': attribute.id,
+                'value_ids': [Command.set(attribute.value_ids.ids)],
+            })],
+        })
+        cls.variants = cls.template.product_variant_ids
+
+    def _count_queries(self, func):
+        """Ejecuta `func` con cachés vacías y retorna (número de consultas, resultado)."""
+        self.env.flush_all()
+        self.env.invalidate_all()
+        self.env['product.product']._invalidate_variant_index()
+        start = self.cr.sql_log_count
+        result = func()
+        return self.cr.sql_log_count - start, result
+
+    def _variant_lines(self, count):
+        return [{
+            'product_id': self.template.id,
+            'variants': self.variants[i % len(self.variants)].product_template_variant_value_ids.ids,
+            'product_uom_qty': i + 1,
+        } for i in range(count)]
+
+    def _create_order(self, count):
+        return self.env['sale.order'].create({
+            'partner_id': self.partner.id,
+            'order_line': [Command.create({
+                'product_id': self.variants[i % len(self.variants)].id,
+                'product_uom_qty': 1.0,
+                'price_unit': 10.0,
+                'tax_id': [Command.clear()],
+            }) for i in range(count)],
+        })
+
+    def _received_lines(self, order):
+        """Todas las líneas sin cambios salvo el precio de la primera."""
+        received = [{
+            'order_line_id': line.id,
+            'product_id': line.product_id.id,
+            'quantity': line.product_uom_qty,
+            'price_unit': line.price_unit,
+            'tax_ids': line.tax_id.ids,
+        } for line in order.order_line]
+        received[0]['price_unit'] = 15.0
+        return received
+
+    def test_process_order_lines_query_count(self):
+        few = self._variant_lines(2)
+        many = self._variant_lines(20)
+
+        with self.assertQueryCount(20):
+            few_count, _few_commands = self._count_queries(
+                lambda: self.controller._process_order_lines(few, self.company))
+        with self.assertQueryCount(20):
+            many_count, many_commands = self._count_queries(
+                lambda: self.controller._process_order_lines(many, self.company))
+
+        self.assertEqual(few_count, many_count)
+        self.assertEqual(len(many_commands), 20)
+        self.assertEqual(
+            [command[2]['product_id'] for command in many_commands],
+            [self.variants[i % len(self.variants)].id for i in range(20)])
+
+    def test_diff_order_lines_query_count(self):
+        few_order = self._create_order(2)
+        many_order = self._create_order(20)
+        few = self._received_lines(few_order)
+        many = self._received_lines(many_order)
+
+        with self.assertQueryCount(10):
+            few_count, _few_commands = self._count_queries(
+                lambda: self.controller._diff_order_lines(few_order, few))
+        with self.assertQueryCount(10):
+            many_count, many_commands = self._count_queries(
+                lambda: self.controller._diff_order_lines(many_order, many))
+
+        self.assertEqual(few_count, many_count)
+        # Solo la línea con precio distinto genera un comando
+        self.assertEqual(many_commands, [(1, many_order.order_line[0].id, {'price_unit': 15.0})])
+
+    def test_diff_order_lines_only_new_lines(self):
+        """Sin líneas existentes que comparar solo se leen los ids, no todos los campos de las líneas."""
+        order = self._create_order(20)
+        new_line = {'product_id': self.variants[0].id, 'quantity': 2.0, 'price_unit': 12.0}
+
+        with self.assertQueryCount(2):
+            count, commands = self._count_queries(
+                lambda: self.controller._diff_order_lines(order, [new_line]))
+
+        self.assertLessEqual(count, 2)
+        self.assertEqual(commands[0], (0, 0, {
+            'product_id': self.variants[0].id,
+            'product_uom_qty': 2.0,
+            'price_unit': 12.0,
+            'tax_id': [(6, 0, [])],
+        }))
+        self.assertEqual(sorted(command[1] for command in commands[1:]), sorted(order.order_line.ids))
+        self.assertTrue(all(command[0] == 2 for command in commands[1:]))
+
+        with self.assertQueryCount(2):
+            _count, commands = self._count_queries(lambda: self.controller._diff_order_lines(order, []))
+        self.assertEqual(sorted(commands), sorted((2, line_id) for line_id in order.order_line.ids))
@@ -0,0 +1,44 @@
+from odoo import Command
+from odoo.tests import TransactionCase, tagged
+
+from ..controllers.serializers import SERIALIZERS
+from ..tools.serializer import serialize
+
+
+@tagged('post_install', '-at_install')
+class TestSaleOrderQueries(TransactionCase):
+    """El número de consultas al expandir las líneas de /api/sale_orders no depende del tamaño de página."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        partners = cls.env['res.partner'].create([{'name': f'Cliente API {i}'} for i in range(3)])
+        products = cls.env['product.product'].create([
+            {'name': f'Producto API {i}', 'list_price': 10.0 + i} for i in range(4)
+        ])
+        cls.orders = cls.env['sale.order'].create([{
+            'partner_id': partners[i % len(partners)].id,
+            'order_line': [Command.create({
+                'product_id': products[(i + j) % len(products)].id,
+                'product_uom_qty': j + 1,
+            }) for j in range(3)],
+        } for i in range(10)])
+
+    def _count_queries(self, orders):
+        """Serializa `orders` como /api/sale_orders con cachés vacías y retorna (consultas, datos)."""
+        self.env.flush_all()
+        self.env.invalidate_all()
+        orders = self.env['sale.order'].browse(orders.ids)
+        start = self.cr.sql_log_count
+        data = serialize(orders, SERIALIZERS['sale.order'][1])
+        return self.cr.sql_log_count - start, data
+
+    def test_sale_order_list_query_count(self):
+        with self.assertQueryCount(40):
+            one_count, one_data = self._count_queries(self.orders[:1])
+        with self.assertQueryCount(40):
+            page_count, page_data = self._count_queries(self.orders)
+
+        self.assertEqual(one_count, page_count)
+        self.assertEqual(len(page_data), 10)
+        self.assertTrue(all(len(order['products']) == 3 for order in page_data))
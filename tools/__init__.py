@@ -0,0 +1,5 @@
+from . import cache
+from . import image_cache
+from . import metrics
+from . import pagination
+from . import serializer
@@ -0,0 +1,134 @@
+from collections import OrderedDict
+import threading
+import time
+
+# Cachés compartidas por proceso (worker), separadas por base de datos
+_caches = {}
+_caches_lock = threading.Lock()
+
+# Última lectura de cada secuencia de invalidación en el worker: {(dbname, secuencia): (firma, instante)}
+_sequence_reads = {}
+
+
+class LRUTTLCache:
+    """Caché LRU en memoria, acotada en tamaño y con expiración por entrada."""
+
+    def __init__(self, max_size=1024, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+        self._signature = None
+
+    def get(self, key, default=None):
+        """Devuelve el valor de la clave si existe y no ha expirado."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[1] is not None and entry[1] <= now:
+                # Entrada expirada: se descarta
+                del self._data[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, ttl=None):
+        """Guarda un valor; `ttl` en segundos sobrescribe el valor por defecto."""
+        ttl = self.ttl if ttl is None else ttl
+        if ttl is not None and ttl <= 0:
+            return
+        deadline = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, deadline)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[0] if entry is not None else default
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def check_signature(self, signature):
+        """Vacía la caché si la firma de invalidación compartida cambió."""
+        if signature != self._signature:
+            with self._lock:
+                if signature != self._signature:
+                    self._data.clear()
+                    self._signature = signature
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+def get_cache(name, dbname, max_size=1024, ttl=None):
+    """Obtiene (o crea) la caché `name` del worker para la base de datos `dbname`."""
+    key = (dbname, name)
+    cache = _caches.get(key)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.setdefault(key, LRUTTLCache(max_size=max_size, ttl=ttl))
+    return cache
+
+
+def all_caches():
+    """Devuelve las cachés del worker como {(dbname, nombre): caché}."""
+    return dict(_caches)
+
+
+def sequence_signature(env, sequence, max_age=0):
+    """Firma de invalidación basada en una secuencia de PostgreSQL propia.
+
+    Solo cambia cuando se llama a `bump_sequence_after_commit` para esa
+    secuencia (o al recargarse el registry). Con `max_age` (segundos) se
+    reutiliza la última lectura del worker sin consultar la base de datos:
+    un incremento hecho en otro worker puede tardar hasta `max_age`
+    segundos en verse; uno hecho en este worker se ve de inmediato.
+    """
+    key = (env.cr.dbname, sequence)
+    if max_age:
+        read = _sequence_reads.get(key)
+        if (read is not None and read[0][0] == env.registry.registry_sequence
+                and time.monotonic() - read[1] < max_age):
+            return read[0]
+    env.cr.execute(f"SELECT last_value FROM {sequence}")
+    signature = (env.registry.registry_sequence, env.cr.fetchone()[0])
+    _sequence_reads[key] = (signature, time.monotonic())
+    return signature
+
+
+def bump_sequence_after_commit(env, sequence):
+    """Incrementa `sequence` una vez, tras el commit de la transacción actual.
+
+    Incrementarla antes permitiría que un lector concurrente guardara en
+    caché datos sin el cambio bajo la nueva firma.
+    """
+    cr = env.cr
+    if cr.postcommit.data.get(sequence):
+        return
+    cr.postcommit.data[sequence] = True
+    registry = env.registry
+    dbname = cr.dbname
+
+    @cr.postcommit.add
+    def bump():
+        with registry.cursor() as bump_cr:
+            bump_cr.execute(f"SELECT nextval('{sequence}')")
+        # La próxima lectura en este worker consulta la secuencia aunque se pida `max_age`
+        _sequence_reads.pop((dbname, sequence), None)
@@ -0,0 +1,108 @@
+from io import BytesIO
+from odoo.tools import config
+from PIL import Image, UnidentifiedImageError
+import logging
+import os
+import threading
+
+_logger = logging.getLogger(__name__)
+
+# Conversiones simultáneas por worker: acota el uso de CPU de las variantes generadas al vuelo. La
+# conversión se hace en el hilo de la petición, que espera aquí si ya hay tantas en curso
+MAX_CONCURRENT_CONVERSIONS = 2
+_convert_slots = threading.BoundedSemaphore(MAX_CONCURRENT_CONVERSIONS)
+_evict_lock = threading.Lock()
+
+# Bytes estimados de cada directorio de caché en este worker: {ruta: bytes}. Se inicializa con un
+# recorrido del directorio y después se actualiza con cada variante generada
+_cache_sizes = {}
+
+# Al superar el límite se expulsa hasta esta fracción, para no recorrer el directorio en cada fallo
+EVICT_TARGET_RATIO = 0.9
+
+
+def _cache_dir(dbname):
+    # Dentro del filestore para que X-Sendfile/X-Accel-Redirect también pueda servir las variantes
+    path = os.path.join(config.filestore(dbname), 'brain_api_images')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _convert(data, path, output_format):
+    image = Image.open(BytesIO(data))
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+    tmp_path = '%s.%s.tmp' % (path, threading.get_ident())
+    try:
+        image.save(tmp_path, output_format, quality=80, method=4)
+        # Escritura atómica: otro worker nunca ve un archivo a medio escribir
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return os.path.getsize(path)
+
+
+def _scan(cache_dir):
+    """Variantes del directorio como [(mtime, tamaño, ruta)]."""
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.is_file() and not entry.name.endswith('.tmp'):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    return entries
+
+
+def _evict(cache_dir, added):
+    """Suma `added` bytes al tamaño estimado de la caché y, solo si supera el límite, elimina las
+    variantes menos usadas (por mtime) hasta EVICT_TARGET_RATIO del límite.
+
+    La estimación ignora lo que generan otros workers; el recorrido previo a expulsar la corrige.
+    """
+    max_bytes = int(config.get('brain_api_image_cache_mb', 512)) * 1024 * 1024
+    with _evict_lock:
+        total = _cache_sizes.get(cache_dir)
+        if total is None:
+            total = sum(size for _mtime, size, _path in _scan(cache_dir))
+        else:
+            total += added
+        if total > max_bytes:
+            entries = _scan(cache_dir)
+            total = sum(size for _mtime, size, _path in entries)
+            target = max_bytes * EVICT_TARGET_RATIO
+            for _mtime, size, path in sorted(entries):
+                if total <= target:
+                    break
+                try:
+                    os.unlink(path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
+        _cache_sizes[cache_dir] = total
+
+
+def get_variant(dbname, key, load_source, output_format='WEBP'):
+    """Ruta en disco de la variante `key`, generándola si no existe (como mucho
+    MAX_CONCURRENT_CONVERSIONS a la vez por worker).
+
+    `load_source` devuelve los bytes de la imagen de origen y solo se llama en un fallo de caché.
+    Retorna None si Pillow no puede convertir la imagen (SVG, archivo corrupto o demasiado grande).
+    """
+    cache_dir = _cache_dir(dbname)
+    path = os.path.join(cache_dir, '%s.%s' % (key, output_format.lower()))
+    if os.path.exists(path):
+        # Marcar como usada recientemente para la expulsión LRU
+        os.utime(path)
+        return path
+
+    try:
+        data = load_source()
+        with _convert_slots:
+            size = _convert(data, path, output_format)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        _logger.warning("No se pudo convertir la imagen %s a %s: %s", key, output_format, e)
+        return None
+    _evict(cache_dir, size)
+    _logger.debug("Variante de imagen generada: %s", path)
+    return path
@@ -0,0 +1,148 @@
+from collections import defaultdict
+from odoo.http import request
+from odoo.tools import config
+import functools
+import logging
+import threading
+import time
+
+_logger = logging.getLogger(__name__)
+
+# Límites superiores (en segundos) de los buckets del histograma de latencia
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Métricas acumuladas por ruta en este worker: {ruta: RouteMetrics}
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+class RouteMetrics:
+    """Contadores e histograma de latencia de una ruta."""
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.duration = 0.0
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.bytes = 0
+        self.statuses = defaultdict(int)
+
+    def observe(self, status, duration, sql_count, sql_time, size):
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if duration <= bound:
+                self.buckets[index] += 1
+                break
+        self.count += 1
+        self.duration += duration
+        self.sql_count += sql_count
+        self.sql_time += sql_time
+        self.bytes += size
+        self.statuses[status] += 1
+
+
+def record(route, method, status, duration, sql_count, sql_time, size):
+    """Registra una petición y deja una línea estructurada si supera el umbral de lentitud."""
+    with _metrics_lock:
+        metrics = _metrics.get(route)
+        if metrics is None:
+            metrics = _metrics[route] = RouteMetrics()
+        metrics.observe(status, duration, sql_count, sql_time, size)
+
+    slow_ms = float(config.get('brain_api_slow_request_ms', 1000))
+    if duration * 1000 >= slow_ms:
+        _logger.warning(
+            "slow_request route=%s method=%s status=%s duration_ms=%.1f sql_count=%s sql_ms=%.1f bytes=%s",
+            route, method, status, duration * 1000, sql_count, sql_time * 1000, size)
+
+
+def instrument(endpoint):
+    """Envuelve un endpoint decorado con @http.route para medir latencia, SQL y tamaño de respuesta."""
+    if getattr(endpoint, 'brain_instrumented', False):
+        return endpoint
+    routes = endpoint.original_routing.get('routes') or [endpoint.__name__]
+    route = routes if isinstance(routes, str) else routes[0]
+
+    @functools.wraps(endpoint)
+    def wrapper(self, *args, **kwargs):
+        # Odoo acumula consultas y tiempo SQL de la petición en el hilo actual
+        thread = threading.current_thread()
+        sql_count = getattr(thread, 'query_count', 0)
+        sql_time = getattr(thread, 'query_time', 0.0)
+        start = time.perf_counter()
+        status, size = 500, 0
+        try:
+            response = endpoint(self, *args, **kwargs)
+            status = getattr(response, 'status_code', 200)
+            if hasattr(response, 'calculate_content_length'):
+                # Las respuestas en streaming solo conocen su tamaño por Content-Length
+                size = response.content_length or response.calculate_content_length() or 0
+            return response
+        finally:
+            record(route, request.httprequest.method if request else '', status,
+                   time.perf_counter() - start,
+                   getattr(thread, 'query_count', 0) - sql_count,
+                   getattr(thread, 'query_time', 0.0) - sql_time,
+                   size)
+
+    wrapper.brain_instrumented = True
+    return wrapper
+
+
+def instrument_routes(cls):
+    """Instrumenta todos los endpoints @http.route declarados en la clase."""
+    for name, member in list(vars(cls).items()):
+        if callable(member) and hasattr(member, 'original_routing'):
+            setattr(cls, name, instrument(member))
+
+
+def _labels(**labels):
+    return ','.join('%s="%s"' % (key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                    for key, value in labels.items())
+
+
+def render_prometheus(cache_stats=None):
+    """Exporta las métricas del worker en formato de texto de Prometheus."""
+    with _metrics_lock:
+        snapshot = {route: (list(m.buckets), m.count, m.duration, m.sql_count, m.sql_time, m.bytes,
+                            dict(m.statuses))
+                    for route, m in _metrics.items()}
+
+    lines = [
+        '# HELP brain_api_request_duration_seconds Latencia de las rutas de la API.',
+        '# TYPE brain_api_request_duration_seconds histogram',
+    ]
+    for route, (buckets, count, duration, *_rest) in sorted(snapshot.items()):
+        cumulative = 0
+        for bound, hits in zip(LATENCY_BUCKETS, buckets):
+            cumulative += hits
+            lines.append('brain_api_request_duration_seconds_bucket{%s} %d' % (_labels(route=route, le=bound), cumulative))
+        lines.append('brain_api_request_duration_seconds_bucket{%s} %d' % (_labels(route=route, le='+Inf'), count))
+        lines.append('brain_api_request_duration_seconds_sum{%s} %.6f' % (_labels(route=route), duration))
+        lines.append('brain_api_request_duration_seconds_count{%s} %d' % (_labels(route=route), count))
+
+    counters = (
+        ('brain_api_sql_queries_total', 'Consultas SQL ejecutadas por ruta.', 3, '%d'),
+        ('brain_api_sql_seconds_total', 'Tiempo SQL acumulado por ruta.', 4, '%.6f'),
+        ('brain_api_response_bytes_total', 'Bytes de respuesta emitidos por ruta.', 5, '%d'),
+    )
+    for name, help_text, index, value_format in counters:
+        lines += ['# HELP %s %s' % (name, help_text), '# TYPE %s counter' % name]
+        for route, values in sorted(snapshot.items()):
+            lines.append(('%s{%s} ' + value_format) % (name, _labels(route=route), values[index]))
+
+    lines += ['# HELP brain_api_responses_total Respuestas por ruta y código HTTP.',
+              '# TYPE brain_api_responses_total counter']
+    for route, values in sorted(snapshot.items()):
+        for status, hits in sorted(values[6].items()):
+            lines.append('brain_api_responses_total{%s} %d' % (_labels(route=route, status=status), hits))
+
+    if cache_stats:
+        for key in ('hits', 'misses', 'size'):
+            kind = 'gauge' if key == 'size' else 'counter'
+            name = 'brain_api_cache_%s' % (key if key == 'size' else key + '_total')
+            lines += ['# TYPE %s %s' % (name, kind)]
+            for cache_name, stats in sorted(cache_stats.items()):
+                lines.append('%s{%s} %d' % (name, _labels(cache=cache_name), stats[key]))
+
+    return '\n'.join(lines) + '\n'
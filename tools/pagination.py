@@ -0,0 +1,58 @@
+from datetime import datetime
+from odoo.tools import SQL
+import base64
+import json
+
+# Clave estable de la paginación por cursor: se ordena por (clave DESC, id DESC)
+CURSOR_KEYS = {
+    'crm.lead': 'create_date',
+    'product.product': 'create_date',
+    'res.partner': 'create_date',
+    'sale.order': 'date_order',
+}
+
+
+def encode_cursor(value, record_id):
+    """Cursor opaco con la posición (clave, id) del último registro entregado."""
+    payload = json.dumps([value.isoformat(), record_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Decodifica un cursor de encode_cursor(); lanza ValueError si está mal formado."""
+    try:
+        value, record_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return datetime.fromisoformat(value), int(record_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError('Cursor inválido.') from e
+
+
+def search_after(model, domain, cursor, limit):
+    """Página de `limit` registros posteriores a `cursor` (vacío = primera página).
+
+    La comparación por fila (clave, id) < (valor, id) usa directamente el índice
+    compuesto de la tabla, sin OFFSET. Retorna (registros, siguiente cursor o None).
+    """
+    key = CURSOR_KEYS[model._name]
+    table = model._table
+    query = model._search(domain)
+    if cursor:
+        value, record_id = decode_cursor(cursor)
+        query.add_where(SQL("(%s, %s) < (%s, %s)", SQL.identifier(table, key), SQL.identifier(table, 'id'),
+                            value, record_id))
+    query.order = SQL("%s DESC, %s DESC", SQL.identifier(table, key), SQL.identifier(table, 'id'))
+    # Un registro extra indica si existe una página siguiente
+    limit = max(limit, 1)
+    query.limit = limit + 1
+    rows = model.env.execute_query(query.select(SQL.identifier(table, 'id'), SQL.identifier(table, key)))
+
+    next_cursor = encode_cursor(rows[limit - 1][1], rows[limit - 1][0]) if len(rows) > limit else None
+    return model.browse([row[0] for row in rows[:limit]]), next_cursor
+
+
+def estimate_count(model, domain):
+    """Filas estimadas por el planificador de PostgreSQL para el dominio, sin recorrer la tabla."""
+    query = model._search(domain)
+    model.env.cr.execute(SQL("EXPLAIN (FORMAT JSON) %s", query.select()))
+    plan = model.env.cr.fetchone()[0]
+    return int(plan[0]['Plan']['Plan Rows'])
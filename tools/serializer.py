@@ -0,0 +1,214 @@
+from collections import defaultdict
+
+# Marca para los campos que se devuelven tal cual, sin valor por defecto
+_RAW = object()
+
+
+class Field:
+    """Valor en la ruta `path` (p. ej. 'stage_id.name').
+
+    Con `convert` el valor se transforma si no está vacío (si lo está se devuelve None);
+    con `default` se aplica `valor or default`.
+    """
+
+    def __init__(self, path, default=_RAW, convert=None):
+        self.path = path
+        self.default = default
+        self.convert = convert
+
+    def paths(self):
+        return [self.path]
+
+    def serialize(self, row):
+        value = resolve(row, self.path)
+        if self.convert is not None:
+            value = self.convert(value) if value else None
+        if self.default is not _RAW:
+            value = value or self.default
+        return value
+
+
+class Computed:
+    """Valor calculado por `func` a partir de los valores de varias rutas."""
+
+    def __init__(self, func, *paths):
+        self.func = func
+        self._paths = paths
+
+    def paths(self):
+        return list(self._paths)
+
+    def serialize(self, row):
+        return self.func(*(resolve(row, path) for path in self._paths))
+
+
+class Nested:
+    """Objeto anidado para un many2one; None si la relación está vacía."""
+
+    def __init__(self, path, spec):
+        self.path = path
+        self.spec = spec
+
+    def paths(self):
+        return [self.path + '.' + path for path in spec_paths(self.spec)]
+
+    def serialize(self, row):
+        related = _related(row, self.path)
+        return assemble(related, self.spec) if related else None
+
+
+class Many:
+    """Lista de objetos para un one2many/many2many."""
+
+    def __init__(self, path, spec):
+        self.path = path
+        self.spec = spec
+
+    def paths(self):
+        return [self.path + '.' + path for path in spec_paths(self.spec)]
+
+    def serialize(self, row):
+        return [assemble(related, self.spec) for related in _related(row, self.path) or []]
+
+
+def spec_paths(spec):
+    """Rutas de campos necesarias para serializar una especificación."""
+    if isinstance(spec, str):
+        return [spec]
+    if isinstance(spec, dict):
+        return [path for value in spec.values() for path in spec_paths(value)]
+    return spec.paths()
+
+
+def _related(row, path):
+    """Fila (o lista de filas) relacionada sin convertir a ids."""
+    value = row
+    for part in path.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def resolve(row, path):
+    """Valor de una ruta sobre filas ya cargadas; las relaciones se devuelven como ids."""
+    value = _related(row, path)
+    if isinstance(value, dict):
+        return value['id']
+    if isinstance(value, list):
+        return [item['id'] if isinstance(item, dict) else item for item in value]
+    return value
+
+
+def assemble(row, spec):
+    if isinstance(spec, str):
+        return resolve(row, spec)
+    if isinstance(spec, dict):
+        return {key: assemble(row, value) for key, value in spec.items()}
+    return spec.serialize(row)
+
+
+def _subtree(node, fname):
+    if not node.get(fname):
+        node[fname] = {}
+    return node[fname]
+
+
+def build_tree(paths):
+    """Convierte rutas con puntos en un árbol {campo: subárbol o None}."""
+    tree = {}
+    for path in paths:
+        node = tree
+        parts = path.split('.')
+        for part in parts[:-1]:
+            node = _subtree(node, part)
+        node.setdefault(parts[-1], None)
+    return tree
+
+
+def _merge_trees(target, tree):
+    for fname, subtree in tree.items():
+        if subtree:
+            _merge_trees(_subtree(target, fname), subtree)
+        else:
+            target.setdefault(fname, None)
+    return target
+
+
+def fetch(model, ids, tree):
+    """Lee `ids` de `model` y sus relaciones con un read() por modelo relacionado y nivel.
+
+    Retorna {id: fila}; en cada fila los many2one se sustituyen por la fila relacionada
+    (o None) y los x2many por la lista de filas relacionadas.
+    """
+    fnames = [fname for fname in tree if fname != 'id']
+    if not ids:
+        return {}
+    if fnames:
+        rows = model.browse(ids).read(fnames, load=None)
+    else:
+        rows = [{'id': record_id} for record_id in ids]
+
+    # Agrupar las relaciones del nivel por modelo relacionado para leer cada uno una sola vez
+    by_comodel = defaultdict(lambda: ({}, set(), []))
+    for fname in fnames:
+        subtree = tree[fname]
+        if not subtree:
+            continue
+        field = model._fields[fname]
+        comodel_tree, comodel_ids, comodel_fields = by_comodel[field.comodel_name]
+        _merge_trees(comodel_tree, subtree)
+        comodel_fields.append(field)
+        for row in rows:
+            value = row[fname]
+            comodel_ids.update(value if isinstance(value, list) else [value] if value else [])
+
+    for comodel_name, (comodel_tree, comodel_ids, comodel_fields) in by_comodel.items():
+        related = fetch(model.env[comodel_name], list(comodel_ids), comodel_tree)
+        for field in comodel_fields:
+            for row in rows:
+                value = row[field.name]
+                if field.type in ('one2many', 'many2many'):
+                    row[field.name] = [related[i] for i in value if i in related]
+                else:
+                    row[field.name] = related.get(value) if value else None
+
+    return {row['id']: row for row in rows}
+
+
+def select(spec, requested):
+    """Restringe `spec` a las claves de salida pedidas (rutas con puntos, p. ej. 'products.quantity').
+
+    Solo se leen los campos de las claves seleccionadas, de modo que los campos calculados
+    costosos no se evalúan si nadie los pide. 'id' se conserva siempre en el nivel superior.
+    """
+    tree = build_tree(requested)
+    if isinstance(spec, dict) and 'id' in spec:
+        tree.setdefault('id', None)
+    return _select(spec, tree, '')
+
+
+def _select(spec, tree, prefix):
+    if isinstance(spec, (Nested, Many)):
+        return type(spec)(spec.path, _select(spec.spec, tree, prefix))
+    if not isinstance(spec, dict):
+        raise ValueError(f'El campo "{prefix.rstrip(".")}" no tiene subcampos.')
+
+    unknown = [prefix + key for key in tree if key not in spec]
+    if unknown:
+        raise ValueError('Campos desconocidos: ' + ', '.join(sorted(unknown)))
+    return {
+        key: value if tree[key] is None else _select(value, tree[key], prefix + key + '.')
+        for key, value in spec.items() if key in tree
+    }
+
+
+def serialize(records, spec):
+    """Serializa un recordset completo según `spec` con un número de consultas independiente de su tamaño.
+
+    Los campos binarios se leen con bin_size: la respuesta solo necesita saber si existen
+    (p. ej. image_1920 para image_url), nunca su contenido.
+    """
+    records = records.with_context(bin_size=True)
+    rows = fetch(records, records.ids, build_tree(spec_paths(spec)))
+    return [assemble(rows[record_id], spec) for record_id in records.ids if record_id in rows]